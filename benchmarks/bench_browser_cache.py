@@ -0,0 +1,135 @@
+"""
+Page load times of the stand-in site with a persistent vs a temporary browser profile.
+
+Each mode launches Chrome --launches times and loads --pages report pages per
+launch; the times of the last launch are reported, so the persistent profile
+starts with the disk cache an earlier run left behind, like a daily run does.
+Needs Chrome. Run from the repository root:
+
+    python -m benchmarks.bench_browser_cache [--pages 10] [--asset-delay 0.5]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer
+
+from pyppeteer import launch
+
+from report_calendar import is_closed_day
+from standin_site import StandinRequestHandler
+from utils import NEW_APPLICATIONS_REPORT, find_chrome_executable, page_load
+from webdriver import (
+    BROWSER_CACHE_MAX_BYTES,
+    browser_launch_args,
+    prepare_browser_profile,
+)
+
+WIDTH, HEIGHT = 1280, 800
+
+
+def report_dates(count, start_date=datetime(2024, 1, 2)):
+    """
+    Returns count business days from start_date, formatted for page_load.
+    """
+    dates = []
+    report_date = start_date
+    while len(dates) < count:
+        if not is_closed_day(report_date):
+            dates.append(report_date.strftime("%m/%d/%Y"))
+        report_date += timedelta(days=1)
+    return dates
+
+
+async def time_page_loads(executable_path, launch_args, pageurl, dates):
+    """
+    Launches a browser and returns the seconds page_load took for every date.
+    """
+    browser = await launch(
+        executablePath=executable_path, headless=True, args=launch_args
+    )
+    try:
+        page = await browser.newPage()
+        seconds = []
+        for date in dates:
+            start = time.perf_counter()
+            # page_load prints every URL it opens
+            with contextlib.redirect_stdout(io.StringIO()):
+                loaded = await page_load(
+                    page, date, pageurl, NEW_APPLICATIONS_REPORT, timeout=60
+                )
+            if not loaded:
+                raise RuntimeError(f"Stand-in page for {date} did not load")
+            seconds.append(time.perf_counter() - start)
+        return seconds
+    finally:
+        await browser.close()
+
+
+async def run_mode(executable_path, persistent, pageurl, dates, launches):
+    """
+    Returns the page load times of the last of several launches of one mode.
+    """
+    with tempfile.TemporaryDirectory() as data_dir:
+        if persistent:
+            profile_dir, cache_dir = prepare_browser_profile(
+                f"{data_dir}/profile", f"{data_dir}/cache"
+            )
+        else:
+            # pyppeteer creates a fresh profile for every launch
+            profile_dir, cache_dir = None, None
+        launch_args = browser_launch_args(
+            WIDTH, HEIGHT, profile_dir, cache_dir, BROWSER_CACHE_MAX_BYTES
+        )
+        for _ in range(launches):
+            seconds = await time_page_loads(
+                executable_path, launch_args, pageurl, dates
+            )
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--launches", type=int, default=2)
+    parser.add_argument(
+        "--asset-delay",
+        type=float,
+        default=0.5,
+        help="Seconds every uncached asset takes to respond",
+    )
+    args = parser.parse_args()
+
+    executable_path = find_chrome_executable()
+    if executable_path is None:
+        parser.error("Chrome was not found")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandinRequestHandler)
+    server.delay = 0
+    server.asset_delay = args.asset_delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    pageurl = f"http://127.0.0.1:{server.server_port}"
+    dates = report_dates(args.pages)
+
+    print(f"{args.pages} pages per launch, {args.asset_delay}s per uncached asset")
+    print(f"{'profile':<12} {'first page':>12} {'steady state':>14}")
+    try:
+        for name, persistent in (("persistent", True), ("temporary", False)):
+            seconds = asyncio.run(
+                run_mode(executable_path, persistent, pageurl, dates, args.launches)
+            )
+            steady = statistics.median(seconds[1:]) if len(seconds) > 1 else 0
+            print(f"{name:<12} {seconds[0]:>11.3f}s {steady:>13.3f}s")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
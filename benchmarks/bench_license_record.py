@@ -0,0 +1,106 @@
+"""
+Memory of a synthetic year of license rows held as dicts vs LicenseRecord.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_license_record [--days 365] [--rows-per-day 60]
+"""
+
+import argparse
+import csv
+import gc
+import io
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+
+from license_record import LicenseRecord, intern_header
+
+COLUMNS = (
+    "License Number",
+    "Status",
+    "License Type",
+    "Business Name",
+    "City",
+    "County",
+    "Report Date",
+)
+STATUSES = ("ACTIVE", "PENDING", "SURRENDERED")
+LICENSE_TYPES = ("20", "21", "41", "47", "48")
+CITIES = (("SACRAMENTO", "SACRAMENTO"), ("FRESNO", "FRESNO"), ("OAKLAND", "ALAMEDA"))
+
+
+def synthetic_days(days, rows_per_day, seed=0):
+    """
+    Yields one CSV text per report day, as the site's export would be read.
+    """
+    rng = random.Random(seed)
+    start_date = datetime(2023, 1, 1)
+    for day in range(days):
+        report_date = (start_date + timedelta(days=day)).strftime("%B %d, %Y")
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(COLUMNS)
+        for _ in range(rows_per_day):
+            city, county = rng.choice(CITIES)
+            writer.writerow(
+                [
+                    str(rng.randint(100000, 999999)),
+                    rng.choice(STATUSES),
+                    rng.choice(LICENSE_TYPES),
+                    f"BUSINESS {rng.randint(1, 9999)} LLC",
+                    city,
+                    county,
+                    report_date,
+                ]
+            )
+        yield buffer.getvalue()
+
+
+def load_dicts(day_texts):
+    rows = []
+    for text in day_texts:
+        rows.extend(csv.DictReader(io.StringIO(text)))
+    return rows
+
+
+def load_records(day_texts):
+    rows = []
+    for text in day_texts:
+        reader = csv.reader(io.StringIO(text))
+        header = intern_header(next(reader))
+        rows.extend(LicenseRecord(header, values) for values in reader)
+    return rows
+
+
+def measure(loader, day_texts):
+    """
+    Returns the bytes still allocated while the loaded rows are held.
+    """
+    gc.collect()
+    tracemalloc.start()
+    rows = loader(day_texts)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--rows-per-day", type=int, default=60)
+    args = parser.parse_args()
+
+    day_texts = list(synthetic_days(args.days, args.rows_per_day))
+    rows = args.days * args.rows_per_day
+    dict_bytes = measure(load_dicts, day_texts)
+    record_bytes = measure(load_records, day_texts)
+    print(f"{rows} rows, {len(COLUMNS)} columns")
+    print(f"dict:          {dict_bytes / 2**20:6.1f} MiB")
+    print(f"LicenseRecord: {record_bytes / 2**20:6.1f} MiB")
+    print(f"saved:         {1 - record_bytes / dict_bytes:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+from webdriver import pyppeteerBrowserInit
+
+# Broker Settings
+BROKER_HOST = "127.0.0.1"  # Interface the broker listens on
+BROKER_PORT = 9300  # Port the broker listens on
+HEADLESS = True  # Whether to run the shared browser in headless mode
+BROWSER_WIDTH = 1920  # Window width of the shared browser
+BROWSER_HEIGHT = 1080  # Window height of the shared browser
+CONTEXT_LEASE_SECONDS = 300  # Seconds a leased context lives without a renewal
+REAP_INTERVAL = 30  # Seconds between checks for expired context leases
+
+
+class BrowserBroker:
+    """
+    Owns one shared browser and leases isolated incognito contexts to clients.
+
+    A lease lasts lease_seconds and is renewed by its client while in use; the
+    context of a client that crashed without releasing it is closed once its
+    lease expires.
+    """
+
+    def __init__(self, loop, browser, lease_seconds=CONTEXT_LEASE_SECONDS):
+        self.loop = loop
+        self.browser = browser
+        self.lease_seconds = lease_seconds
+        self.contexts = {}
+        self.expires = {}
+        self.lock = Lock()
+
+    def _run(self, coroutine):
+        # Browser calls must run on the loop that owns the browser connection
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout=30)
+
+    def lease_context(self):
+        """
+        Creates an incognito context and returns its id.
+        """
+        context = self._run(self.browser.createIncognitoBrowserContext())
+        with self.lock:
+            self.contexts[context._id] = context
+            self.expires[context._id] = time.time() + self.lease_seconds
+        print(f"Leased browser context {context._id} ({len(self.contexts)} active)")
+        return context._id
+
+    def renew_context(self, context_id):
+        """
+        Extends the lease of a context by lease_seconds.
+
+        Returns:
+            bool: False if the context id is unknown or its lease already expired.
+        """
+        with self.lock:
+            if context_id not in self.contexts:
+                return False
+            self.expires[context_id] = time.time() + self.lease_seconds
+            return True
+
+    def release_context(self, context_id):
+        """
+        Closes a leased context and all of its pages.
+
+        Returns:
+            bool: False if the context id is unknown.
+        """
+        with self.lock:
+            context = self.contexts.pop(context_id, None)
+            self.expires.pop(context_id, None)
+        if context is None:
+            return False
+        self._run(context.close())
+        print(f"Released browser context {context_id} ({len(self.contexts)} active)")
+        return True
+
+    async def reap_expired_contexts(self, interval=REAP_INTERVAL):
+        """
+        Closes contexts whose lease expired, every interval seconds; runs on the loop.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            now = time.time()
+            with self.lock:
+                expired = [
+                    (context_id, self.contexts.pop(context_id))
+                    for context_id, expires in list(self.expires.items())
+                    if expires < now
+                ]
+                for context_id, _ in expired:
+                    del self.expires[context_id]
+            for context_id, context in expired:
+                try:
+                    await context.close()
+                except Exception as e:
+                    print(f"Error closing expired browser context {context_id}: {e}")
+                print(f"Closed expired browser context {context_id}")
+
+
+class BrokerRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP interface of the broker.
+
+    Endpoints:
+    - GET /json/version: the shared browser's DevTools websocket endpoint.
+    - POST /contexts: lease a new incognito context.
+    - PUT /contexts/<id>: renew the lease of a context.
+    - DELETE /contexts/<id>: release a leased context.
+    """
+
+    def do_GET(self):
+        if self.path == "/json/version":
+            self._send_json(
+                200,
+                {
+                    "webSocketDebuggerUrl": self.server.broker.browser.wsEndpoint,
+                    "activeContexts": len(self.server.broker.contexts),
+                },
+            )
+        else:
+            self._send_json(404, {"error": "Unknown endpoint"})
+
+    def do_POST(self):
+        if self.path == "/contexts":
+            context_id = self.server.broker.lease_context()
+            self._send_json(
+                201,
+                {
+                    "contextId": context_id,
+                    "leaseSeconds": self.server.broker.lease_seconds,
+                },
+            )
+        else:
+            self._send_json(404, {"error": "Unknown endpoint"})
+
+    def do_PUT(self):
+        match = re.fullmatch(r"/contexts/([\w-]+)", self.path)
+        if match and self.server.broker.renew_context(match.group(1)):
+            self._send_json(200, {"contextId": match.group(1)})
+        else:
+            self._send_json(404, {"error": "Unknown context"})
+
+    def do_DELETE(self):
+        match = re.fullmatch(r"/contexts/([\w-]+)", self.path)
+        if match and self.server.broker.release_context(match.group(1)):
+            self._send_json(200, {"contextId": match.group(1)})
+        else:
+            self._send_json(404, {"error": "Unknown context"})
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    """
+    Launches the shared browser and serves context leases until interrupted.
+    """
+    parser = argparse.ArgumentParser(description="Shared browser broker")
+    parser.add_argument("--host", default=BROKER_HOST, help="Broker interface")
+    parser.add_argument("--port", type=int, default=BROKER_PORT, help="Broker port")
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    # The shared browser uses the persistent profile so every job hits a warm cache
+    browser = pyppeteerBrowserInit(loop, HEADLESS, BROWSER_WIDTH, BROWSER_HEIGHT)
+    if browser is None:
+        return
+
+    server = ThreadingHTTPServer((args.host, args.port), BrokerRequestHandler)
+    server.broker = BrowserBroker(loop, browser)
+    loop.create_task(server.broker.reap_expired_contexts())
+    Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Browser broker listening on http://{args.host}:{args.port}")
+    print(f"Shared browser endpoint: {browser.wsEndpoint}")
+
+    try:
+        # Keep the loop running so the broker's browser connection stays alive
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        loop.run_until_complete(browser.close())
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import sys
+
+# Columns whose values repeat across thousands of rows and are worth interning
+CATEGORICAL_FIELDS = frozenset(
+    {
+        "License Type",
+        "Status",
+        "Type Status",
+        "Transfer Type",
+        "City",
+        "State",
+        "County",
+        "Report Date",
+    }
+)
+
+# Canonical header tuples, shared by every record read with the same columns
+_HEADERS = {}
+
+
+def intern_header(fields):
+    """
+    Returns the shared tuple for a list of column names.
+
+    Parameters:
+    - fields (iterable): Column names in file order.
+
+    Returns:
+    - tuple: A header tuple that is reused by every record with the same columns.
+    """
+    fields = tuple(sys.intern(field) for field in fields)
+    return _HEADERS.setdefault(fields, fields)
+
+
+class LicenseRecord:
+    """
+    A compact license row: a shared header tuple plus a tuple of values.
+
+    Values of CATEGORICAL_FIELDS are interned, so a year of rows carries a
+    single copy of every distinct license type, status, city and report date.
+    """
+
+    __slots__ = ("header", "values")
+
+    def __init__(self, header, values):
+        self.header = header
+        self.values = tuple(
+            sys.intern(value) if field in CATEGORICAL_FIELDS else value
+            for field, value in zip(header, values)
+        )
+
+    def get(self, field, default=""):
+        """
+        Returns the value of a column, or default if the record does not have it.
+        """
+        try:
+            return self.values[self.header.index(field)]
+        except (ValueError, IndexError):
+            return default
+
+    def __getitem__(self, field):
+        return self.values[self.header.index(field)]
+
+    def with_field(self, field, value):
+        """
+        Returns a copy of the record with a column set, appending it if missing.
+        """
+        if field in self.header:
+            values = list(self.values)
+            values[self.header.index(field)] = value
+            return LicenseRecord(self.header, values)
+        return LicenseRecord(
+            intern_header(self.header + (field,)), self.values + (value,)
+        )
+
+    def values_for(self, fieldnames):
+        """
+        Returns the record's values in the order of fieldnames, blank where missing.
+        """
+        if fieldnames == self.header:
+            return self.values
+        return tuple(self.get(field) for field in fieldnames)
+
+    def as_dict(self):
+        """
+        Returns the record as a plain dict keyed by column name.
+        """
+        return dict(zip(self.header, self.values))
+
+    def __repr__(self):
+        return f"LicenseRecord({self.as_dict()!r})"
@@ -1,8 +1,9 @@
 import asyncio
 import os
+import sys
 import time
 import tkinter as tk
-from datetime import datetime, timedelta
+from datetime import datetime
 from threading import Thread
 from tkinter import ttk, filedialog
 import pyppeteer
@@ -10,18 +11,34 @@ from CTkMessagebox import CTkMessagebox
 from pyppeteer.errors import TimeoutError as PyppeteerTimeoutError
 from screeninfo import get_monitors
 from tkcalendar import DateEntry
+from partitioned_output import SINGLE_FILE_LAYOUT, write_partitioned_report
+from pipeline import (
+    FetchBudget,
+    RunSummary,
+    prepare_download_page,
+    report_spool_file,
+    run_report_pipeline,
+    spool_run_files,
+)
+from page_timings import PageTimings
+from profiling import RunProfiler
+from report_claims import ClaimTable
+from report_calendar import SKIP_EMPTY_DATES
+from staging import ESTIMATED_BYTES_PER_DAY, create_staging
 from utils import (
-    convert_csv_to_json_and_add_report_date,
-    delete_directory,
     delete_file,
     get_default_download_path,
-    list_files_in_directory,
     merge_csv_files,
-    page_load,
+    NEW_APPLICATIONS_REPORT,
     print_the_output_statement,
-    Read_Csv,
+    report_type_name,
+)
+from webdriver import (
+    close_browser_context,
+    open_browser_context,
+    pyppeteerBrowserConnect,
+    pyppeteerBrowserInit,
 )
-from webdriver import pyppeteerBrowserInit
 
 
 # Application Settings
@@ -34,13 +51,35 @@ APP_BUTTON_NAME1 = "Close Window"  # Text on the close window button
 
 # Headless Setting
 HEADLESS = True  # Whether to run the app in headless mode (no GUI)
+# Shared Browser Setting: 'ws://' DevTools URL or 'http://' broker address; None launches a local Chrome
+BROWSER_ENDPOINT = None
 PAGE_URL = "https://www.abc.ca.gov/licensing/licensing-reports/new-applications/"  # URL for licensing reports
+# Profiling Setting
+PROFILE = "--profile" in sys.argv  # Write CPU and allocation profiles with the report
 # Threading Settings
 MAX_THREAD_COUNT = 10  # Maximum number of threads for concurrent processing
+# Timeout Settings, in seconds
+PAGE_LOAD_TIMEOUT = 30  # Navigation to a report page
+SELECTOR_TIMEOUT = 20  # Appearance of the CSV download button
+DATE_TIMEOUT = 90  # Whole report date, from navigation to finished download
+RUN_DEADLINE = None  # Overall budget of a run; None for no deadline
 # Report Settings
 FILE_TYPE = "csv"  # Type of file to generate ('csv' or 'xlsx')
 FILE_NAME = "ABCLicensingReport"  # Base name for generated report files
-FILE_TEMP_FOLDER = "temp"  # Temporary folder for storing generated files
+OUTPUT_LAYOUT = SINGLE_FILE_LAYOUT  # 'single' file, or 'month' / 'day' partitions
+OUTPUT_COMPRESSION = None  # Compression of partition files: None, 'gzip' or 'zstd'
+MAX_ROWS_IN_FLIGHT = 1000  # Maximum number of report rows held in memory at once
+REPORT_TYPES = (NEW_APPLICATIONS_REPORT,)  # RPTTYPE values fetched in one session
+COMBINED_REPORT_OUTPUT = True  # One file with a 'Report Type' column, or one per type
+# No-Data Calendar Settings
+NO_DATA_CALENDAR_FILE = "no_data_calendar.json"  # Dates known to have no applications
+EMPTY_DATE_POLICY = SKIP_EMPTY_DATES  # Or PROBE_EMPTY_DATES_LAST to fetch them last
+REVERIFY_EMPTY_DATES = False  # Fetch expected-empty dates again to re-verify them
+# Page Timing Settings
+PAGE_TIMINGS_FILE = "page_timings.json"  # Page latencies the waits are learned from
+PINNED_PAGE_TIMINGS = {}  # Values used instead of learned ones, e.g. {"download": 10}
+# Single-Flight Setting: local folder shared with other runs on this machine so each date is fetched once; None fetches independently
+CLAIMS_DIR = None
 
 # Screen Resolution Settings
 width = get_monitors()[0].width  # Width of the primary monitor
@@ -51,8 +90,8 @@ async def Generate_the_Report_and_Download(
     browser, start_date, end_date, output, start_time
 ):
     """
-    Generates a report by scraping data for a date range, downloading CSV files,
-    converting them to JSON, and optionally merging into a single CSV.
+    Generates a report by scraping data for a date range, streaming each downloaded
+    CSV into a staged spool file, and optionally saving it as a single CSV.
     Parameters:
     - browser (pyppeteer.browser.Browser): Pyppeteer browser instance.
     - start_date (str): Start date in 'Month Day, Year' format (e.g., 'January 1, 2023').
@@ -68,221 +107,241 @@ async def Generate_the_Report_and_Download(
     print_the_output_statement(output, "Data Processing Started...")
     print_the_output_statement(output, "Please wait for the Report generation.")
 
-    error_response = []
-    Response = ""
-    download_path = get_default_download_path()
+    total_rows = 0
+    budget = FetchBudget(
+        PAGE_LOAD_TIMEOUT, SELECTOR_TIMEOUT, DATE_TIMEOUT, RUN_DEADLINE
+    )
+    summary = RunSummary()
+    claims = ClaimTable(CLAIMS_DIR) if CLAIMS_DIR else None
+    timings = PageTimings(PAGE_TIMINGS_FILE, PINNED_PAGE_TIMINGS)
+    profiler = RunProfiler(enabled=PROFILE)
+    report_path = os.path.join(os.getcwd(), FILE_NAME)
+
+    # Stage intermediate files in memory, on tmpfs or in the local temp folder
+    start_date = datetime.strptime(start_date, "%B %d, %Y")
+    end_date = datetime.strptime(end_date, "%B %d, %Y")
+    days = (end_date - start_date).days + 1
+    staging = create_staging(max(days, 1) * len(REPORT_TYPES) * ESTIMATED_BYTES_PER_DAY)
+    spool_file = f"{FILE_NAME}_generate_report.csv"
+    download_path = staging.download_dir or get_default_download_path()
+    if BROWSER_ENDPOINT and not staging.download_dir:
+        # Jobs sharing a browser must not download into the same file
+        download_path = os.path.join(download_path, f"abc-report-{os.getpid()}")
     print("download_path", download_path)
 
-    # Define the path for downloading the CSV file
-    source_file = f"{download_path}/CA-ABC-LicenseReport.csv"
-    print("source_file", source_file)
-
-    # Create a new page in the browser context
-    page = await browser.newPage()
-
-    # Delete the existing CSV file if it exists
-    delete_file(source_file) if os.path.exists(source_file) else ""
-
-    # Ensure the download directory exists
-    os.makedirs(download_path, exist_ok=True)
+    try:
+        # Define the path for downloading the CSV file
+        source_file = f"{download_path}/CA-ABC-LicenseReport.csv"
+        print("source_file", source_file)
+
+        # Create a new page in the browser context, isolated when the browser is shared
+        context = (
+            await open_browser_context(browser, BROWSER_ENDPOINT)
+            if BROWSER_ENDPOINT
+            else browser
+        )
+        page = await context.newPage()
+
+        # Delete any CSV file left over from a previous run
+        delete_file(source_file) if os.path.exists(source_file) else ""
+
+        # Configure downloads and viewport for the page
+        await prepare_download_page(page, download_path, width, height)
+
+        try:
+            # Stream each date through the fetch, parse, normalize and sink stages
+            with profiler.section("scrape"):
+                total_rows = await run_report_pipeline(
+                    page,
+                    start_date,
+                    end_date,
+                    PAGE_URL,
+                    source_file,
+                    spool_file,
+                    output,
+                    MAX_ROWS_IN_FLIGHT,
+                    NO_DATA_CALENDAR_FILE,
+                    EMPTY_DATE_POLICY,
+                    REVERIFY_EMPTY_DATES,
+                    REPORT_TYPES,
+                    COMBINED_REPORT_OUTPUT,
+                    budget,
+                    summary,
+                    staging,
+                    claims,
+                    timings,
+                )
 
-    # Configure browser to allow downloads to specified path
-    await page._client.send(
-        "Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_path}
-    )
+        except PyppeteerTimeoutError as timeout_error:
+            # Handle Pyppeteer timeout error
+            CTkMessagebox(
+                title="Error",
+                message="Internal Error Occurred while running application. Please Try Again!!",
+                icon="cancel",
+            )
 
-    # Set viewport dimensions for the page
-    await page.setViewport({"width": width, "height": height})
+        except pyppeteer.errors.NetworkError:
+            # Handle Pyppeteer network error
+            CTkMessagebox(
+                title="Error",
+                message="Internal Error Occurred while running application. Please Try Again!!",
+                icon="cancel",
+            )
 
-    try:
-        # Convert start_date and end_date strings to datetime objects
-        start_date = datetime.strptime(start_date, "%B %d, %Y")
-        end_date = datetime.strptime(end_date, "%B %d, %Y")
-
-        # Iterate through each date in the specified range
-        while start_date <= end_date:
-            formatted_date = start_date.strftime("%m/%d/%Y")
-            print(f"Scrapping the data {formatted_date}")
-
-            # Load the page for the current formatted date
-            load_page = await page_load(page, formatted_date, PAGE_URL)
-
-            if load_page:
-                print(f"Page loaded successfully")
-
-                # Wait for page elements to settle
-                await asyncio.sleep(5)
-
-                # Determine viewport height for scrolling
-                viewport_height = await page.evaluate("window.innerHeight")
-                print("Viewport height obtained")
-
-                # Scroll down to load additional content
-                scroll_distance = int(viewport_height * 0.3)
-                await page.evaluate(f"window.scrollBy(0, {scroll_distance})")
-                print("Short scrolling...")
-
-                # Check if specific element indicating no data is present
-                check_script = """
-                    () => {
-                        const elements = document.querySelectorAll('.et_pb_code_inner');
-                        for (let element of elements) {
-                            if (element.textContent.trim() === 'There were no new applications taken on the selected report date.') {
-                                return true;
-                            }
-                        }
-                        return false;
-                    }
-                """
-                element_exists = await page.evaluate(check_script)
-                if element_exists:
-                    # Handle a case where no data is found for the date
-                    print_the_output_statement(
-                        output,
-                        f"There were no new applications taken on the selected report date. {start_date}:",
-                    )
-                else:
-                    # Check if the table element exists on the page
-                    table_exists = await page.evaluate(
-                        'document.querySelector("table#license_report tbody tr") !== null'
-                    )
+        except Exception as e:
+            # Handle any other unexpected exceptions
+            CTkMessagebox(
+                title="Error",
+                message="Internal Error Occurred while running application. Please Try Again!!",
+                icon="cancel",
+            )
 
-                    if table_exists:
-                        # Perform long scrolling to load more data
-                        scroll_distance = int(viewport_height * 3.9)
-                        await page.evaluate(f"window.scrollBy(0, {scroll_distance})")
-                        print("Long scrolling...")
+        finally:
+            # Close the browser session, leaving a shared browser running
+            if BROWSER_ENDPOINT:
+                await close_browser_context(context, BROWSER_ENDPOINT)
+                await browser.disconnect()
+            else:
+                await browser.close()
+
+            # Report the dates that were deferred or missed the time budget
+            for line in summary.lines():
+                print_the_output_statement(output, line)
+            for line in timings.lines():
+                print(line)
+
+            # Calculate total execution time
+            end_time = time.time()
+            total_time = end_time - start_time
+
+            # Display the appropriate message based on the number of rows collected
+            if total_rows == 0:
+                CTkMessagebox(
+                    title="Error",
+                    message=f"No Report is found on the dated {start_date} & {end_date}",
+                    icon="cancel",
+                )
 
-                        # Wait for the CSV download button to appear
-                        await page.waitForXPath(
-                            '//*[@class="btn btn-default buttons-csv buttons-html5 abclqs-download-btn et_pb_button et_pb_button_0 et_pb_bg_layout_dark"]'
-                        )
-                        download_csv_btn = await page.xpath(
-                            '//*[@class="btn btn-default buttons-csv buttons-html5 abclqs-download-btn et_pb_button et_pb_button_0 et_pb_bg_layout_dark"]'
-                        )
+            else:
+                # Prompt user to download the generated report
+                msg = CTkMessagebox(
+                    title="Info",
+                    message="Report Successfully Generated.\n Click OK to Download",
+                    option_1="Cancel",
+                    option_2="Ok",
+                )
 
-                        print(f"Download button found: {download_csv_btn}")
+                if msg.get() == "Ok":
+                    # Construct file name based on start and end dates
+                    start_date_str = start_date_entry.get_date().strftime("%Y-%B-%d")
+                    end_date_str = end_date_entry.get_date().strftime("%Y-%B-%d")
+                    FileName = f"{FILE_NAME}_{start_date_str}_{end_date_str}"
 
-                        # Click on the download button to download CSV
-                        await download_csv_btn[0].click()
-                        print("Clicked on download button successfully!")
-                        print("Downloading...")
+                    # Prompt user to select a folder for saving the data
+                    save_folder = filedialog.askdirectory(
+                        initialdir=os.getcwd(), title="Select Folder to Save Data"
+                    )
 
-                        # Wait briefly for the file to download
-                        await asyncio.sleep(7)
-                        print(f"File downloaded to {source_file}")
-                        error_response = Read_Csv(source_file)
-                        # Convert downloaded CSV to JSON and add report date
-                        success, Response = convert_csv_to_json_and_add_report_date(
-                            source_file, FILE_NAME, FILE_TEMP_FOLDER, start_date
+                    if save_folder:
+                        with profiler.section("merge"):
+                            if len(REPORT_TYPES) > 1 and not COMBINED_REPORT_OUTPUT:
+                                # Save one report per report type
+                                for report_type in REPORT_TYPES:
+                                    type_runs = spool_run_files(
+                                        report_spool_file(spool_file, report_type),
+                                        staging.exists,
+                                    )
+                                    if type_runs:
+                                        merge_the_file = save_report(
+                                            type_runs,
+                                            save_folder,
+                                            f"{FileName}_{report_type_name(report_type)}",
+                                            staging,
+                                        )
+                            elif len(REPORT_TYPES) > 1:
+                                # Merge the per-type spool files into one report by date
+                                merge_the_file = save_report(
+                                    [
+                                        path
+                                        for report_type in REPORT_TYPES
+                                        for path in spool_run_files(
+                                            report_spool_file(spool_file, report_type),
+                                            staging.exists,
+                                        )
+                                    ],
+                                    save_folder,
+                                    FileName,
+                                    staging,
+                                )
+                            else:
+                                # Save the staged spool file as one report
+                                merge_the_file = save_report(
+                                    spool_run_files(spool_file, staging.exists),
+                                    save_folder,
+                                    FileName,
+                                    staging,
+                                )
+                        report_path = merge_the_file
+                        print("merge_the_file", merge_the_file)
+                        # Display a success message with file location
+                        CTkMessagebox(
+                            message=f"Generated Report Successfully on the dated {start_date} & {end_date} and saved the file to  {merge_the_file} ",
+                            icon="check",
+                            option_1="Thanks",
                         )
-                        if success:
-                            (
-                                delete_file(source_file)
-                                if os.path.exists(source_file)
-                                else ""
-                            )
-
-                        print_the_output_statement(
-                            output, f"Data found for {formatted_date}."
-                        )
-
                     else:
-                        # Handle cases where table does not exist for the date
-                        error_response = True
-                        print_the_output_statement(
-                            output,
-                            f"There were no new applications taken on the selected report date. {start_date}:",
+                        # Display message if user cancels download
+                        CTkMessagebox(
+                            message=f"Generated Report Successfully on the dated {start_date} & {end_date} but you have cancelled the download ",
+                            icon="check",
+                            option_1="Thanks",
                         )
+            # Write the profiles next to the report when running with --profile
+            profiler.write_reports(report_path)
 
-            start_date += timedelta(days=1)
-
-    except PyppeteerTimeoutError as timeout_error:
-        # Handle Pyppeteer timeout error
-        CTkMessagebox(
-            title="Error",
-            message="Internal Error Occurred while running application. Please Try Again!!",
-            icon="cancel",
-        )
-
-    except pyppeteer.errors.NetworkError:
-        # Handle Pyppeteer network error
-        CTkMessagebox(
-            title="Error",
-            message="Internal Error Occurred while running application. Please Try Again!!",
-            icon="cancel",
-        )
-
-    except Exception as e:
-        # Handle any other unexpected exceptions
-        CTkMessagebox(
-            title="Error",
-            message="Internal Error Occurred while running application. Please Try Again!!",
-            icon="cancel",
-        )
-
-    finally:
-        # Close the browser session
-        await browser.close()
-
-        # Calculate total execution time
-        end_time = time.time()
-        total_time = end_time - start_time
-
-        # Display the appropriate message based on error_response status
-        if len(error_response) == 0:
-            CTkMessagebox(
-                title="Error",
-                message=f"No Report is found on the dated {start_date} & {end_date}",
-                icon="cancel",
+            # Display total execution time in the output window
+            print_the_output_statement(
+                output, f"Total execution time: {total_time:.2f} seconds"
             )
+    finally:
+        # Remove the staged downloads and spool files on every path, including a
+        # failed run and a cancelled download
+        staging.cleanup()
 
-        else:
-            # Prompt user to download the generated report
-            msg = CTkMessagebox(
-                title="Info",
-                message="Report Successfully Generated.\n Click OK to Download",
-                option_1="Cancel",
-                option_2="Ok",
-            )
 
-            if msg.get() == "Ok":
-                # Construct file name based on start and end dates
-                start_date_str = start_date_entry.get_date().strftime("%Y-%B-%d")
-                end_date_str = end_date_entry.get_date().strftime("%Y-%B-%d")
-                FileName = f"{FILE_NAME}_{start_date_str}_{end_date_str}"
+def save_report(file_paths, save_folder, file_name, staging):
+    """
+    Saves spool files as a single CSV file or as partitioned files, per OUTPUT_LAYOUT.
 
-                # Prompt user to select a folder for saving the data
-                save_folder = filedialog.askdirectory(
-                    initialdir=os.getcwd(), title="Select Folder to Save Data"
-                )
+    Args:
+        file_paths (list): Names of staged spool run files, each in 'Report Date'
+            order; their rows are merged by 'Report Date'.
+        save_folder (str): Folder selected by the user.
+        file_name (str): Name of the report file or folder.
+        staging (MemoryStaging or DiskStaging): Backend holding the spool files.
 
-                if save_folder:
-                    # Retrieve a list of file paths in the response directory
-                    file_paths = list_files_in_directory(Response)
-                    # Merge the files into a single CSV file
-                    merge_the_file = merge_csv_files(
-                        file_paths, save_folder, FileName, FILE_TYPE, Response
-                    )
-                    print("merge_the_file", merge_the_file)
-                    # Display a success message with file location
-                    CTkMessagebox(
-                        message=f"Generated Report Successfully on the dated {start_date} & {end_date} and saved the file to  {merge_the_file} ",
-                        icon="check",
-                        option_1="Thanks",
-                    )
-                else:
-                    delete_directory(rf"{Response}")
-                    # Display message if user cancels download
-                    CTkMessagebox(
-                        message=f"Generated Report Successfully on the dated {start_date} & {end_date} but you have cancelled the download ",
-                        icon="check",
-                        option_1="Thanks",
-                    )
-        # Display total execution time in the output window
-        print_the_output_statement(
-            output, f"Total execution time: {total_time:.2f} seconds"
+    Returns:
+        str: Path to the merged CSV file, or to the manifest of a partitioned report.
+    """
+    if OUTPUT_LAYOUT == SINGLE_FILE_LAYOUT:
+        return merge_csv_files(
+            file_paths,
+            save_folder,
+            file_name,
+            FILE_TYPE,
+            None,
+            staging.open,
+            interleave_by_date=True,
         )
+    return write_partitioned_report(
+        file_paths,
+        save_folder,
+        file_name,
+        OUTPUT_LAYOUT,
+        OUTPUT_COMPRESSION,
+        staging.open,
+        interleave_by_date=True,
+    )
 
 
 def run_scraping_thread(
@@ -368,8 +427,11 @@ def generate_daily_report():
         loop = asyncio.new_event_loop()
         print("browser init")
 
-        # Initialize the browser
-        browser = pyppeteerBrowserInit(loop, HEADLESS, width, height)
+        # Initialize the browser, or connect to the shared one
+        if BROWSER_ENDPOINT:
+            browser = pyppeteerBrowserConnect(loop, BROWSER_ENDPOINT)
+        else:
+            browser = pyppeteerBrowserInit(loop, HEADLESS, width, height)
         print("browser init completed")
 
         # Start a new thread for scraping
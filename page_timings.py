@@ -0,0 +1,160 @@
+import json
+import os
+from collections import deque
+
+# Values used until enough samples have been observed: waits in seconds, scroll
+# positions in viewport heights from the top of the page
+TIMING_DEFAULTS = {
+    "settle": 5.0,  # Page load until the report table or the no-data text appears
+    "render": 20.0,  # Scrolling until the table's CSV button appears
+    "download": 7.0,  # Clicking the CSV button until the file is saved
+    "short_scroll": 0.3,  # Scroll position that brings the report table into view
+    "long_scroll": 4.2,  # Scroll position that brings the CSV button into view
+}
+# Upper limits of the learned waits, however slow the samples are
+TIMING_MAXIMUMS = {"settle": 30.0, "render": 60.0, "download": 60.0}
+WAIT_TIMINGS = tuple(TIMING_MAXIMUMS)
+TIMING_WINDOW = 50  # Most recent samples kept per timing
+TIMING_MIN_SAMPLES = 5  # Samples needed before a learned value replaces the default
+TIMING_PERCENTILE = 95  # Percentile of the samples a learned value is based on
+TIMING_MARGIN_FACTOR = 1.2  # Learned waits are the percentile times this factor...
+TIMING_MARGIN_SECONDS = 0.5  # ...plus this many seconds
+
+
+def percentile(samples, percent):
+    """
+    Returns the nearest-rank percentile of a non-empty sequence of numbers.
+    """
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+class PageTimings:
+    """
+    Rolling samples of observed page latencies and scroll positions, persisted as JSON.
+
+    Waits are derived from the TIMING_PERCENTILE of the last TIMING_WINDOW
+    samples plus a margin, scroll positions from the percentile alone. Learned
+    waits never drop below their TIMING_DEFAULTS: a wait is only an upper
+    bound, so a short one saves nothing on pages that load in time and fails
+    the ones that are slow. Nor do they rise above TIMING_MAXIMUMS. Values in
+    pinned (from the constructor, or the "pinned" object of the file) are used
+    as is and never learned.
+
+    A timeout only shows that the page took longer than the wait used, so it
+    is kept apart from the samples: it holds the wait at the value that timed
+    out until a page of that timing finishes in time, rather than becoming a
+    sample the margin is added to again on every timeout.
+    """
+
+    def __init__(self, timings_file=None, pinned=None):
+        self.timings_file = timings_file
+        self.samples = {name: deque(maxlen=TIMING_WINDOW) for name in TIMING_DEFAULTS}
+        self.timeouts = {name: deque(maxlen=TIMING_WINDOW) for name in WAIT_TIMINGS}
+        self.file_pinned = {}
+        if timings_file and os.path.exists(timings_file):
+            try:
+                with open(timings_file, "r") as f:
+                    data = json.load(f)
+                for name, values in data.get("samples", {}).items():
+                    if name in self.samples:
+                        self.samples[name].extend(float(value) for value in values)
+                for name, values in data.get("timeouts", {}).items():
+                    if name in self.timeouts:
+                        self.timeouts[name].extend(float(value) for value in values)
+                self.file_pinned.update(data.get("pinned", {}))
+            except (OSError, ValueError, TypeError) as e:
+                print(f"Ignoring unreadable page timings '{timings_file}': {e}")
+        self.pinned = {**self.file_pinned, **(pinned or {})}
+
+    def record(self, name, value):
+        """
+        Adds an observed sample of a timing; a wait that finished in time
+        releases the oldest timeout holding it.
+        """
+        if value is not None:
+            self.samples[name].append(round(float(value), 3))
+            if self.timeouts.get(name):
+                self.timeouts[name].popleft()
+
+    def record_timeout(self, name, waited):
+        """
+        Records a wait that ran out, holding the learned wait at no less than
+        the time waited until a page of the timing finishes in time.
+        """
+        self.timeouts[name].append(round(float(waited), 3))
+
+    def learned(self, name):
+        """
+        Returns the value learned from the samples of a timing, or None if too
+        few; a wait held by timeouts is learned from them alone if need be.
+        """
+        samples = self.samples[name]
+        held = max(self.timeouts.get(name) or [0])
+        if len(samples) < TIMING_MIN_SAMPLES and not held:
+            return None
+        if name not in WAIT_TIMINGS:
+            return round(percentile(samples, TIMING_PERCENTILE), 3)
+        value = TIMING_DEFAULTS[name]
+        if len(samples) >= TIMING_MIN_SAMPLES:
+            value = max(
+                percentile(samples, TIMING_PERCENTILE) * TIMING_MARGIN_FACTOR
+                + TIMING_MARGIN_SECONDS,
+                value,
+            )
+        return round(min(max(value, held), TIMING_MAXIMUMS[name]), 3)
+
+    def value(self, name):
+        """
+        Returns the pinned, learned or default value of a timing, in that order.
+        """
+        if name in self.pinned:
+            return float(self.pinned[name])
+        learned = self.learned(name)
+        return TIMING_DEFAULTS[name] if learned is None else learned
+
+    def as_dict(self):
+        """
+        Returns the values in use, how each was chosen and the samples they come from.
+        """
+        return {
+            "values": {name: self.value(name) for name in TIMING_DEFAULTS},
+            "learned": {name: self.learned(name) for name in TIMING_DEFAULTS},
+            "pinned": dict(self.pinned),
+            "samples": {name: list(values) for name, values in self.samples.items()},
+            "timeouts": {name: list(values) for name, values in self.timeouts.items()},
+        }
+
+    def lines(self):
+        """
+        Returns one human-readable line per timing, for the output window.
+        """
+        lines = []
+        for name in TIMING_DEFAULTS:
+            if name in self.pinned:
+                source = "pinned"
+            elif self.learned(name) is None:
+                source = "default"
+            else:
+                source = f"p{TIMING_PERCENTILE} of {len(self.samples[name])} samples"
+                if self.timeouts.get(name):
+                    source += f", {len(self.timeouts[name])} timeouts"
+            lines.append(f"Page timing {name}: {self.value(name):g} ({source})")
+        return lines
+
+    def save(self):
+        """
+        Writes the samples and values to the timings file; only values pinned in
+        the file itself are written back as pinned.
+        """
+        if not self.timings_file:
+            return
+        data = self.as_dict()
+        data["pinned"] = dict(self.file_pinned)
+        directory = os.path.dirname(os.path.abspath(self.timings_file))
+        os.makedirs(directory, exist_ok=True)
+        temp_file = f"{self.timings_file}.tmp"
+        with open(temp_file, "w") as f:
+            json.dump(data, f, indent=4)
+        os.replace(temp_file, self.timings_file)
@@ -0,0 +1,217 @@
+import csv
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+from utils import iter_aligned_csv_rows
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
+
+# Partition layouts
+SINGLE_FILE_LAYOUT = "single"  # One CSV file, as written by merge_csv_files
+MONTH_PARTITIONS = "month"  # year=YYYY/month=MM/
+DAY_PARTITIONS = "day"  # year=YYYY/month=MM/day=DD/
+
+# Compression formats
+GZIP_COMPRESSION = "gzip"
+ZSTD_COMPRESSION = "zstd"
+COMPRESSION_EXTENSIONS = {None: "", GZIP_COMPRESSION: ".gz", ZSTD_COMPRESSION: ".zst"}
+
+MANIFEST_NAME = "manifest.json"
+
+
+def partition_path(report_date, partition_by):
+    """
+    Returns the relative partition folder of a report date.
+
+    Parameters:
+    - report_date (datetime.datetime): Report date of the rows.
+    - partition_by (str): MONTH_PARTITIONS or DAY_PARTITIONS.
+
+    Returns:
+    - str: e.g. 'year=2024/month=03' or 'year=2024/month=03/day=15'.
+    """
+    parts = [f"year={report_date:%Y}", f"month={report_date:%m}"]
+    if partition_by == DAY_PARTITIONS:
+        parts.append(f"day={report_date:%d}")
+    return "/".join(parts)
+
+
+def _open_partition(path, compression):
+    """
+    Opens a partition file for appending text, compressing while writing.
+    """
+    if compression == GZIP_COMPRESSION:
+        return gzip.open(path, "at", newline="", encoding="utf-8")
+    if compression == ZSTD_COMPRESSION:
+        return zstandard.open(path, "at", newline="", encoding="utf-8")
+    return open(path, "a", newline="", encoding="utf-8")
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_partitioned_report(
+    file_paths,
+    save_folder,
+    file_name,
+    partition_by=MONTH_PARTITIONS,
+    compression=None,
+    opener=open,
+    interleave_by_date=False,
+):
+    """
+    Writes report rows into date-partitioned, optionally compressed CSV files.
+
+    Parameters:
+    - file_paths (list): CSV files to read, with a 'Report Date' column in
+      'Month DD, YYYY' format.
+    - save_folder (str): Folder the partitioned report is created in.
+    - file_name (str): Name of the report folder and of each partition file.
+    - partition_by (str): MONTH_PARTITIONS or DAY_PARTITIONS.
+    - compression (str, optional): None, GZIP_COMPRESSION or ZSTD_COMPRESSION.
+    - opener (callable): Opens the input files; the open method of a staging
+      backend to read them from staging.
+    - interleave_by_date (bool): Merge rows of the files in 'Report Date' order
+      instead of reading the files one after another.
+
+    Returns:
+    - str: Path to the manifest, which lists the relative path, row count and
+      SHA-256 of every partition file.
+
+    Notes:
+    - Rows are streamed; only one partition file is open at a time. Rows are
+      expected in date order, a partition seen again is appended to.
+    - Files with different columns are aligned on the union of their columns.
+    - The report is written into a temporary folder next to the report folder
+      and swapped in when complete, so rerunning into an existing folder leaves
+      no stale partitions, and a failed run leaves the previous report intact.
+    """
+    if compression == ZSTD_COMPRESSION and zstandard is None:
+        print("zstandard is not installed, using gzip compression instead")
+        compression = GZIP_COMPRESSION
+
+    report_folder = os.path.join(save_folder, file_name)
+    os.makedirs(save_folder, exist_ok=True)
+    build_folder = tempfile.mkdtemp(prefix=f".{file_name}.", dir=save_folder)
+    try:
+        manifest = _write_partitions(
+            file_paths,
+            build_folder,
+            file_name,
+            partition_by,
+            compression,
+            opener,
+            interleave_by_date,
+        )
+        _replace_folder(build_folder, report_folder)
+    except BaseException:
+        shutil.rmtree(build_folder, ignore_errors=True)
+        raise
+
+    print(
+        f"Wrote {len(manifest['partitions'])} partitions of '{file_name}' "
+        f"to '{report_folder}'"
+    )
+    return os.path.join(report_folder, MANIFEST_NAME)
+
+
+def _replace_folder(new_folder, folder):
+    """
+    Moves new_folder to folder, removing what was there before.
+    """
+    old_folder = None
+    if os.path.exists(folder):
+        old_folder = tempfile.mkdtemp(
+            prefix=f".{os.path.basename(folder)}.old.", dir=os.path.dirname(folder)
+        )
+        os.replace(folder, os.path.join(old_folder, "report"))
+    os.replace(new_folder, folder)
+    if old_folder:
+        shutil.rmtree(old_folder, ignore_errors=True)
+
+
+def _write_partitions(
+    file_paths,
+    report_folder,
+    file_name,
+    partition_by,
+    compression,
+    opener,
+    interleave_by_date,
+):
+    """
+    Writes the partition files and manifest of a report into an empty folder.
+
+    Returns:
+    - dict: The manifest.
+    """
+    partition_file = f"{file_name}.csv{COMPRESSION_EXTENSIONS[compression]}"
+
+    row_counts = {}
+    parsed_dates = {}
+    current_partition = None
+    outfile = writer = None
+    headers, rows = iter_aligned_csv_rows(file_paths, opener, interleave_by_date)
+    try:
+        date_index = headers.index("Report Date") if headers else None
+        for row in rows:
+            report_date = row[date_index]
+            if report_date not in parsed_dates:
+                parsed_dates[report_date] = partition_path(
+                    datetime.strptime(report_date, "%B %d, %Y"), partition_by
+                )
+            partition = parsed_dates[report_date]
+
+            if partition != current_partition:
+                if outfile:
+                    outfile.close()
+                path = os.path.join(report_folder, partition, partition_file)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                new_file = partition not in row_counts
+                outfile = _open_partition(path, compression)
+                writer = csv.writer(outfile)
+                if new_file:
+                    writer.writerow(headers)
+                    row_counts[partition] = 0
+                current_partition = partition
+
+            writer.writerow(row)
+            row_counts[partition] += 1
+    finally:
+        if outfile:
+            outfile.close()
+
+    partitions = []
+    for partition in sorted(row_counts):
+        relative_path = f"{partition}/{partition_file}"
+        partitions.append(
+            {
+                "path": relative_path,
+                "rows": row_counts[partition],
+                "sha256": _file_sha256(os.path.join(report_folder, relative_path)),
+            }
+        )
+    manifest = {
+        "partition_by": partition_by,
+        "compression": compression,
+        "columns": headers or None,
+        "total_rows": sum(row_counts.values()),
+        "partitions": partitions,
+    }
+    manifest_file = os.path.join(report_folder, MANIFEST_NAME)
+    with open(manifest_file, "w") as f:
+        json.dump(manifest, f, indent=4)
+    return manifest
@@ -0,0 +1,834 @@
+import asyncio
+import csv
+import os
+import shutil
+import time
+from collections import deque
+from datetime import timedelta
+from itertools import islice
+
+from pyppeteer.errors import TimeoutError as PyppeteerTimeoutError
+
+from license_record import LicenseRecord, intern_header
+from page_timings import PageTimings
+from report_claims import (
+    BUSY,
+    CLAIM_LEASE_MARGIN,
+    CLAIM_POLL_INTERVAL,
+    DATA,
+    EMPTY,
+    FETCHING,
+)
+from report_calendar import (
+    SKIP_EMPTY_DATES,
+    load_no_data_calendar,
+    no_data_key,
+    save_no_data_calendar,
+    schedule_report_jobs,
+)
+from utils import (
+    NEW_APPLICATIONS_REPORT,
+    count_csv_rows,
+    delete_file,
+    page_load,
+    print_the_output_statement,
+    report_type_name,
+)
+
+# Default number of rows buffered between the normalize stage and the sink
+MAX_ROWS_IN_FLIGHT = 1000
+
+# Default per-stage timeouts, in seconds
+PAGE_LOAD_TIMEOUT = 30  # Navigation to the report page
+SELECTOR_TIMEOUT = 20  # Appearance of the CSV download button
+JOB_TIMEOUT = 90  # Whole job, from navigation to finished download
+MAX_JOB_ATTEMPTS = 2  # Attempts of a job that times out before it is missed
+
+# Text shown by the site when a report date has no applications
+NO_APPLICATIONS_TEXT = (
+    "There were no new applications taken on the selected report date."
+)
+# Prefix of the text shown by the site when any report type has no data
+NO_DATA_TEXT_PREFIX = "There were no"
+
+# Total number of entries of the report table: the DataTables API if available,
+# else the "Showing X to Y of N entries" info text, else the rendered rows
+TABLE_ENTRY_COUNT_SCRIPT = """
+    () => {
+        const table = document.querySelector('table#license_report');
+        if (!table) {
+            return null;
+        }
+        if (window.jQuery && jQuery.fn.dataTable && jQuery.fn.dataTable.isDataTable(table)) {
+            return jQuery(table).DataTable().rows({search: 'applied'}).count();
+        }
+        const info = document.querySelector('#license_report_info');
+        const match = info && info.textContent.match(/of\\s+([\\d,]+)\\s+entries/);
+        if (match) {
+            return parseInt(match[1].replace(/,/g, ''), 10);
+        }
+        return table.querySelectorAll('tbody tr').length;
+    }
+"""
+
+# True once the report table has rows or the site shows its no-data text
+PAGE_SETTLED_SCRIPT = f"""
+    () => document.querySelector('table#license_report tbody tr') !== null
+        || Array.from(document.querySelectorAll('.et_pb_code_inner')).some(
+            element => element.textContent.trim().startsWith('{NO_DATA_TEXT_PREFIX}'))
+"""
+
+# Positions of the report table's top and the CSV button's bottom, in viewport
+# heights from the top of the page
+PAGE_GEOMETRY_SCRIPT = """
+    () => {
+        const offset = (element, edge) => element
+            ? (element.getBoundingClientRect()[edge] + window.scrollY) / window.innerHeight
+            : null;
+        return [
+            offset(document.querySelector('table#license_report'), 'top'),
+            offset(document.querySelector('.buttons-csv'), 'bottom'),
+        ];
+    }
+"""
+
+# Seconds between checks while waiting for the page or a download
+POLL_INTERVAL = 0.25
+# Seconds a download that missed its wait may still land before the job moves on;
+# a file that lands in this time is discarded so it is never taken for the next job's
+LATE_DOWNLOAD_GRACE = 5
+
+# XPath of the DataTables "CSV" export button
+CSV_DOWNLOAD_BUTTON_XPATH = '//*[@class="btn btn-default buttons-csv buttons-html5 abclqs-download-btn et_pb_button et_pb_button_0 et_pb_bg_layout_dark"]'
+
+
+async def prepare_download_page(page, download_path, width, height):
+    """
+    Configures a page to save downloads into download_path and sets its viewport.
+
+    Parameters:
+    - page: Puppeteer page object.
+    - download_path (str): Folder the browser saves downloads to.
+    - width (int): Viewport width.
+    - height (int): Viewport height.
+    """
+    # Ensure the download directory exists
+    os.makedirs(download_path, exist_ok=True)
+
+    # Configure browser to allow downloads to specified path
+    await page._client.send(
+        "Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_path}
+    )
+
+    # Set viewport dimensions for the page
+    await page.setViewport({"width": width, "height": height})
+
+
+def iter_report_dates(start_date, end_date):
+    """
+    Date source stage: yields every date between start_date and end_date (inclusive).
+
+    Parameters:
+    - start_date (datetime.datetime): First report date.
+    - end_date (datetime.datetime): Last report date.
+
+    Yields:
+    - datetime.datetime: The next report date, in ascending order.
+    """
+    while start_date <= end_date:
+        yield start_date
+        start_date += timedelta(days=1)
+
+
+def iter_report_jobs(start_date, end_date, report_types=(NEW_APPLICATIONS_REPORT,)):
+    """
+    Job source stage: yields a (report_type, report_date) job per type and date.
+
+    Parameters:
+    - start_date (datetime.datetime): First report date.
+    - end_date (datetime.datetime): Last report date.
+    - report_types (iterable): RPTTYPE values to fetch.
+
+    Yields:
+    - tuple: (report_type, report_date), interleaving the types of each date so
+      that every type's rows come out in date order.
+    """
+    report_types = list(report_types)
+    for report_date in iter_report_dates(start_date, end_date):
+        for report_type in report_types:
+            yield report_type, report_date
+
+
+class FetchBudget:
+    """
+    Per-stage timeouts of a fetch and the deadline of the whole run, in seconds.
+
+    A job that exceeds its timeout is cancelled and deferred to the end of the
+    queue until it has used max_attempts; once the run deadline has passed, no
+    new job is started.
+    """
+
+    def __init__(
+        self,
+        page_load_timeout=PAGE_LOAD_TIMEOUT,
+        selector_timeout=SELECTOR_TIMEOUT,
+        job_timeout=JOB_TIMEOUT,
+        run_deadline=None,
+        max_attempts=MAX_JOB_ATTEMPTS,
+    ):
+        self.page_load_timeout = page_load_timeout
+        self.selector_timeout = selector_timeout
+        self.job_timeout = job_timeout
+        self.max_attempts = max_attempts
+        self.deadline = time.monotonic() + run_deadline if run_deadline else None
+
+    def remaining(self):
+        """
+        Returns the seconds left before the run deadline, or None without a deadline.
+        """
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def next_job_timeout(self):
+        """
+        Returns the timeout of the next job, capped by the time left in the run.
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return self.job_timeout
+        return min(self.job_timeout, remaining)
+
+
+class RunSummary:
+    """
+    Collects what happened to the report jobs of a run.
+
+    verification maps every downloaded (report_type, report_date) to a tuple
+    (status, expected_rows, downloaded_rows), where status is 'verified',
+    'mismatch' or 'unverified' (the page did not expose an entry count).
+    """
+
+    def __init__(self):
+        self.deferred = []
+        self.missed = []
+        self.verification = {}
+
+    def lines(self):
+        """
+        Returns the summary as human readable lines.
+        """
+        lines = []
+        statuses = [status for status, _, _ in self.verification.values()]
+        if statuses:
+            lines.append(
+                f"Verified {statuses.count('verified')} of {len(statuses)} downloads "
+                f"against the table entry count"
+            )
+        lines += [
+            f"{status.capitalize()} {report_type_name(report_type)} {report_date:%m/%d/%Y}: "
+            f"expected {expected if expected is not None else '?'} rows, downloaded {downloaded}"
+            for (report_type, report_date), (
+                status,
+                expected,
+                downloaded,
+            ) in self.verification.items()
+            if status != "verified"
+        ]
+        lines += [
+            f"Deferred {report_type_name(report_type)} {report_date:%m/%d/%Y} after a failed attempt"
+            for report_type, report_date in self.deferred
+        ]
+        lines += [
+            f"Missed {report_type_name(report_type)} {report_date:%m/%d/%Y}: {reason}"
+            for report_type, report_date, reason in self.missed
+        ]
+        return lines
+
+
+async def cancel_stuck_page(page):
+    """
+    Stops any navigation of a page and parks it on a blank document.
+
+    Parameters:
+    - page: Puppeteer page object whose job was cancelled.
+    """
+    try:
+        await asyncio.wait_for(page._client.send("Page.stopLoading"), 5)
+        await page.goto("about:blank", timeout=5000)
+    except Exception as e:
+        print(f"Error resetting stuck page: {e}")
+
+
+async def wait_for_condition(condition, timeout, interval=POLL_INTERVAL):
+    """
+    Polls an async condition until it is true or timeout seconds have passed.
+
+    Parameters:
+    - condition (callable): Coroutine function returning a truthy value when done.
+    - timeout (float): Maximum number of seconds to wait.
+    - interval (float): Seconds between checks.
+
+    Returns:
+    - float or None: Seconds it took for the condition to become true, or None
+      if it was still false after timeout seconds.
+    """
+    start = time.monotonic()
+    while True:
+        if await condition():
+            return time.monotonic() - start
+        if time.monotonic() - start >= timeout:
+            return None
+        await asyncio.sleep(interval)
+
+
+async def fetch_report_job(
+    page, report_type, report_date, pageurl, source_file, output, budget, timings=None
+):
+    """
+    Loads the report page of one job and downloads its CSV export.
+
+    Parameters:
+    - page: Puppeteer page object configured to download into the folder of source_file.
+    - report_type (int): RPTTYPE of the report.
+    - report_date (datetime.datetime): Report date.
+    - pageurl (str): Base URL for the licensing report page.
+    - source_file (str): Path the browser saves the CSV export to.
+    - output (tk.Text): Tkinter Text widget for displaying status messages.
+    - budget (FetchBudget): Per-stage timeouts.
+    - timings (PageTimings, optional): Learned waits and scroll positions; updated
+      with the latencies and positions observed on this page.
+
+    Returns:
+    - tuple: (result, expected_rows) where result is 'data' if source_file was
+      downloaded, 'empty' if the report has no data, or 'failed' if the page or
+      the download did not load; expected_rows is the table's entry count, or
+      None if the page did not expose one.
+    """
+    check_script = f"""
+        () => {{
+            const elements = document.querySelectorAll('.et_pb_code_inner');
+            for (let element of elements) {{
+                if (element.textContent.trim().startsWith('{NO_DATA_TEXT_PREFIX}')) {{
+                    return true;
+                }}
+            }}
+            return false;
+        }}
+    """
+    timings = timings or PageTimings()
+    formatted_date = report_date.strftime("%m/%d/%Y")
+    print(f"Scrapping the {report_type_name(report_type)} data {formatted_date}")
+
+    # Load the page for the current formatted date
+    if not await page_load(
+        page, formatted_date, pageurl, report_type, budget.page_load_timeout
+    ):
+        return "failed", None
+    print(f"Page loaded successfully")
+
+    # Wait for the table or the no-data text to appear; a page that shows
+    # neither has not loaded, which must not be mistaken for an empty report
+    settle_wait = min(timings.value("settle"), budget.job_timeout)
+    settle_time = await wait_for_condition(
+        lambda: page.evaluate(PAGE_SETTLED_SCRIPT), settle_wait
+    )
+    if settle_time is None:
+        timings.record_timeout("settle", settle_wait)
+        print(f"Page did not settle within {settle_wait:g} seconds")
+        return "failed", None
+    timings.record("settle", settle_time)
+    print(f"Page settled in {settle_time:.2f} seconds")
+
+    # Determine viewport height for scrolling
+    viewport_height = await page.evaluate("window.innerHeight")
+    print("Viewport height obtained")
+
+    # Scroll down to bring the report table into view
+    scroll_position = int(viewport_height * timings.value("short_scroll"))
+    await page.evaluate(f"window.scrollTo(0, {scroll_position})")
+    print("Short scrolling...")
+
+    # Check if specific element indicating no data is present, then if the table exists
+    if await page.evaluate(check_script) or not await page.evaluate(
+        'document.querySelector("table#license_report tbody tr") !== null'
+    ):
+        if report_type == NEW_APPLICATIONS_REPORT:
+            message = NO_APPLICATIONS_TEXT
+        else:
+            message = f"There was no {report_type_name(report_type)} data on the selected report date."
+        print_the_output_statement(output, f"{message} {report_date}:")
+        return "empty", None
+
+    # Perform long scrolling to load more data
+    scroll_position = int(viewport_height * timings.value("long_scroll"))
+    await page.evaluate(f"window.scrollTo(0, {scroll_position})")
+    print("Long scrolling...")
+
+    # Wait for the table to render its CSV download button
+    render_start = time.monotonic()
+    render_wait = min(timings.value("render"), budget.selector_timeout)
+    try:
+        await page.waitForXPath(CSV_DOWNLOAD_BUTTON_XPATH, timeout=render_wait * 1000)
+    except PyppeteerTimeoutError:
+        timings.record_timeout("render", render_wait)
+        raise
+    timings.record("render", time.monotonic() - render_start)
+
+    # Learn where the table and the button are, for the scrolls of the next pages
+    table_top, button_bottom = await page.evaluate(PAGE_GEOMETRY_SCRIPT)
+    timings.record("short_scroll", table_top)
+    if button_bottom is not None:
+        timings.record("long_scroll", max(button_bottom - 1, 0))
+
+    # Read the number of entries the table holds, to verify the download against
+    expected_rows = await page.evaluate(TABLE_ENTRY_COUNT_SCRIPT)
+    print(f"Table entry count: {expected_rows}")
+
+    # Click the CSV download button
+    download_csv_btn = await page.xpath(CSV_DOWNLOAD_BUTTON_XPATH)
+    print(f"Download button found: {download_csv_btn}")
+    await download_csv_btn[0].click()
+    print("Clicked on download button successfully!")
+    print("Downloading...")
+
+    # Wait for the file to download
+    async def downloaded():
+        return os.path.exists(source_file)
+
+    download_wait = min(timings.value("download"), budget.job_timeout)
+    download_time = await wait_for_condition(downloaded, download_wait)
+    if download_time is None:
+        print(
+            f"Download did not complete for {formatted_date} in {download_wait:g} seconds"
+        )
+        late_time = await wait_for_condition(downloaded, LATE_DOWNLOAD_GRACE)
+        if late_time is None:
+            timings.record_timeout("download", download_wait)
+        else:
+            # The late download still shows how long downloads take now
+            timings.record("download", download_wait + late_time)
+            print(f"Discarding the late download of {formatted_date}")
+            delete_file(source_file)
+        return "failed", expected_rows
+    timings.record("download", download_time)
+    print(f"File downloaded to {source_file} in {download_time:.2f} seconds")
+    return "data", expected_rows
+
+
+async def fetch_report_files(
+    page,
+    report_jobs,
+    pageurl,
+    source_file,
+    output,
+    no_data_dates=None,
+    budget=None,
+    summary=None,
+    claims=None,
+    timings=None,
+):
+    """
+    Fetch stage: downloads the CSV export for each report job within a time budget.
+
+    Parameters:
+    - page: Puppeteer page object configured to download into the folder of source_file.
+    - report_jobs (iterable): (report_type, report_date) jobs, typically from iter_report_jobs.
+    - pageurl (str): Base URL for the licensing report page.
+    - source_file (str): Path the browser saves the CSV export to.
+    - output (tk.Text): Tkinter Text widget for displaying status messages.
+    - no_data_dates (set, optional): Keys from no_data_key of jobs with no data;
+      updated in place as jobs are found empty or found to have data.
+    - budget (FetchBudget, optional): Timeouts and run deadline; defaults apply if omitted.
+    - summary (RunSummary, optional): Records deferred jobs, jobs that missed the
+      budget and the verification status of every download.
+    - claims (ClaimTable, optional): Shared claim table; a job claimed by another
+      worker is not fetched again, its result is reused once it is finished.
+    - timings (PageTimings, optional): Learned waits and scroll positions, updated
+      from every page fetched.
+
+    Yields:
+    - tuple: (report_type, report_date, source_file) for every job that has data.
+
+    Notes:
+    - Only one downloaded file exists at a time: it is deleted as soon as the
+      consumer asks for the next date, so the caller must finish reading it first.
+    - A job that times out or fails (page error, page not found, download that
+      never lands) is retried after the other jobs, so its rows come after
+      those of later dates; after budget.max_attempts it is recorded as missed
+      with the reason.
+    - A download whose row count differs from the table's entry count is
+      fetched again right away; if it still differs after budget.max_attempts,
+      it is kept and reported as a mismatch.
+    - A job another worker is fetching is moved to the end of the queue, so its
+      rows come after those of later dates too.
+    """
+    budget = budget or FetchBudget()
+    summary = summary if summary is not None else RunSummary()
+    timings = timings or PageTimings()
+    queue = deque((job, 1) for job in report_jobs)
+    waiting = 0  # Jobs popped in a row that were claimed by another worker
+    while queue:
+        (report_type, report_date), attempt = queue.popleft()
+        timeout = budget.next_job_timeout()
+        if timeout <= 0:
+            # The run deadline has passed: every job left is missed
+            summary.missed.append((report_type, report_date, "run deadline reached"))
+            summary.missed.extend(
+                (job_type, job_date, "run deadline reached")
+                for (job_type, job_date), _ in queue
+            )
+            print_the_output_statement(
+                output, f"Run deadline reached, {len(queue) + 1} jobs not fetched."
+            )
+            break
+
+        delete_file(source_file) if os.path.exists(source_file) else ""
+        state = FETCHING
+        if claims is not None:
+            state, expected_rows = claims.claim(
+                report_type, report_date, timeout + CLAIM_LEASE_MARGIN
+            )
+        if state == BUSY:
+            # Another worker is fetching this job: fetch the others in the meantime
+            queue.append(((report_type, report_date), attempt))
+            waiting += 1
+            if waiting >= len(queue):
+                await asyncio.sleep(CLAIM_POLL_INTERVAL)
+                waiting = 0
+            continue
+        waiting = 0
+
+        reason = None
+        if state == DATA:
+            print(f"Reusing the download of {report_date:%m/%d/%Y} by another worker")
+            shutil.copyfile(claims.result_path(report_type, report_date), source_file)
+            result = "data"
+        elif state == EMPTY:
+            result = "empty"
+        else:
+            try:
+                result, expected_rows = await asyncio.wait_for(
+                    fetch_report_job(
+                        page,
+                        report_type,
+                        report_date,
+                        pageurl,
+                        source_file,
+                        output,
+                        budget,
+                        timings,
+                    ),
+                    timeout,
+                )
+            except (asyncio.TimeoutError, PyppeteerTimeoutError):
+                result = "timeout"
+            except Exception as e:
+                # A page error (navigation, script, missing button) fails only this job
+                print(f"Error fetching {report_date:%m/%d/%Y}: {e!r}")
+                result, reason = "failed", f"{type(e).__name__}: {e}"
+            if claims is not None and result in ("timeout", "failed"):
+                claims.release(report_type, report_date)
+            elif claims is not None and result == "empty":
+                claims.complete(report_type, report_date)
+
+        if result in ("timeout", "failed"):
+            await cancel_stuck_page(page)
+            if result == "timeout":
+                reason = "timed out"
+            elif reason is None:
+                reason = "page or download did not load"
+            remaining = budget.remaining()
+            if attempt < budget.max_attempts and (remaining is None or remaining > 0):
+                print(
+                    f"{reason.capitalize()}, deferring {report_date:%m/%d/%Y} "
+                    f"to the end of the run"
+                )
+                summary.deferred.append((report_type, report_date))
+                queue.append(((report_type, report_date), attempt + 1))
+            else:
+                summary.missed.append(
+                    (report_type, report_date, f"{reason} ({attempt} attempts)")
+                )
+            continue
+
+        if result == "empty":
+            if no_data_dates is not None:
+                no_data_dates.add(no_data_key(report_type, report_date))
+            continue
+        if result != "data":
+            continue
+
+        # Verify the download is complete before passing it on
+        downloaded_rows = count_csv_rows(source_file)
+        if expected_rows is None:
+            status = "unverified"
+        elif downloaded_rows == expected_rows:
+            status = "verified"
+        else:
+            status = "mismatch"
+            print(
+                f"Downloaded {downloaded_rows} rows for {report_date:%m/%d/%Y}, "
+                f"expected {expected_rows}"
+            )
+            if attempt < budget.max_attempts:
+                queue.appendleft(((report_type, report_date), attempt + 1))
+                continue
+        if state == FETCHING and claims is not None:
+            claims.complete(report_type, report_date, source_file, expected_rows)
+        summary.verification[(report_type, report_date)] = (
+            status,
+            expected_rows,
+            downloaded_rows,
+        )
+
+        if no_data_dates is not None:
+            no_data_dates.discard(no_data_key(report_type, report_date))
+
+        yield report_type, report_date, source_file
+        delete_file(source_file)
+        print_the_output_statement(
+            output, f"Data found for {report_date.strftime('%m/%d/%Y')}."
+        )
+
+
+def parse_report_rows(csv_file):
+    """
+    Parse stage: lazily reads the rows of a downloaded report CSV.
+
+    Parameters:
+    - csv_file (str): Path to the CSV file.
+
+    Yields:
+    - LicenseRecord: One record per license, sharing the file's header tuple.
+    """
+    with open(csv_file, "r", newline="", encoding="utf-8-sig") as csvfile:
+        reader = csv.reader(csvfile)
+        headers = next(reader, None)
+        if headers is None:
+            return
+        header = intern_header(headers)
+        for values in reader:
+            if not values:
+                continue
+            if len(values) < len(header):
+                values += [""] * (len(header) - len(values))
+            yield LicenseRecord(header, values)
+
+
+def normalize_rows(rows, report_date, report_type=None):
+    """
+    Normalize stage: stamps every row with its 'Report Date' and, optionally, 'Report Type'.
+
+    Parameters:
+    - rows (iterable): Rows from parse_report_rows.
+    - report_date (datetime.datetime): Date the rows were reported on.
+    - report_type (int, optional): RPTTYPE of the rows; adds a 'Report Type' column.
+
+    Yields:
+    - LicenseRecord: The record with a 'Report Date' field in 'Month DD, YYYY' format.
+    """
+    formatted_date = report_date.strftime("%B %d, %Y")
+    type_name = report_type_name(report_type) if report_type is not None else None
+    for row in rows:
+        row = row.with_field("Report Date", formatted_date)
+        yield row if type_name is None else row.with_field("Report Type", type_name)
+
+
+def report_spool_file(spool_file, report_type):
+    """
+    Returns the per-type spool file of a report type, e.g. 'report_2.csv'.
+    """
+    root, extension = os.path.splitext(spool_file)
+    return f"{root}_{report_type}{extension}"
+
+
+def spool_run_file(spool_file, run):
+    """
+    Returns the file of a date-ordered run of a spool, e.g. 'report.run1.csv'.
+    """
+    if run == 0:
+        return spool_file
+    root, extension = os.path.splitext(spool_file)
+    return f"{root}.run{run}{extension}"
+
+
+def spool_run_files(spool_file, exists=os.path.exists):
+    """
+    Returns the run files of a spool written by run_report_pipeline.
+
+    Parameters:
+    - spool_file (str): Spool file, or per-type spool file, of the run.
+    - exists (callable): Checks whether a file exists; the exists method of a
+      staging backend for staged spools.
+
+    Returns:
+    - list: The run files, each in 'Report Date' order, to be merged by date
+      (interleave_by_date) into one date-ordered report.
+    """
+    run_files = []
+    while exists(spool_run_file(spool_file, len(run_files))):
+        run_files.append(spool_run_file(spool_file, len(run_files)))
+    return run_files
+
+
+def append_rows_to_csv(
+    rows, output_file, max_rows_in_flight=MAX_ROWS_IN_FLIGHT, opener=open
+):
+    """
+    Sink stage: appends rows to a CSV file, buffering at most max_rows_in_flight rows.
+
+    Parameters:
+    - rows (iterable): Normalized LicenseRecord rows.
+    - output_file (str): CSV file to append to. The header is taken from the file
+      if it already has one, otherwise from the first record.
+    - max_rows_in_flight (int): Maximum number of rows held in memory at once.
+    - opener (callable): Opens output_file; the open method of a staging backend
+      to write into staging instead of the file system.
+
+    Returns:
+    - int: Number of rows written.
+    """
+    rows = iter(rows)
+    fieldnames = None
+    try:
+        with opener(output_file, "r", newline="", encoding="utf-8") as infile:
+            headers = next(csv.reader(infile), None)
+            fieldnames = intern_header(headers) if headers else None
+    except FileNotFoundError:
+        pass
+
+    written = 0
+    with opener(output_file, "a", newline="", encoding="utf-8") as outfile:
+        writer = csv.writer(outfile)
+        while True:
+            batch = list(islice(rows, max_rows_in_flight))
+            if not batch:
+                break
+            if fieldnames is None:
+                fieldnames = batch[0].header
+                writer.writerow(fieldnames)
+            writer.writerows(row.values_for(fieldnames) for row in batch)
+            outfile.flush()
+            written += len(batch)
+    return written
+
+
+async def run_report_pipeline(
+    page,
+    start_date,
+    end_date,
+    pageurl,
+    source_file,
+    spool_file,
+    output,
+    max_rows_in_flight=MAX_ROWS_IN_FLIGHT,
+    calendar_file=None,
+    empty_date_policy=SKIP_EMPTY_DATES,
+    reverify_empty_dates=False,
+    report_types=(NEW_APPLICATIONS_REPORT,),
+    combined_output=True,
+    budget=None,
+    summary=None,
+    staging=None,
+    claims=None,
+    timings=None,
+):
+    """
+    Streams every report job through fetch, parse, normalize and sink stages.
+
+    Parameters:
+    - page: Puppeteer page object configured to download into the folder of source_file.
+    - start_date (datetime.datetime): First report date.
+    - end_date (datetime.datetime): Last report date.
+    - pageurl (str): Base URL for the licensing report page.
+    - source_file (str): Path the browser saves the CSV export to.
+    - spool_file (str): CSV file the normalized rows are appended to; a name
+      within staging when staging is given. With several report types, each
+      type is appended to its own report_spool_file, since the types do not
+      share the same columns. A day older than the last day of its spool
+      (re-queued, deferred or probed last) starts a new spool_run_file, so
+      every run file is in date order; read them with spool_run_files.
+    - output (tk.Text): Tkinter Text widget for displaying status messages.
+    - max_rows_in_flight (int): Maximum number of rows held in memory at once.
+    - calendar_file (str, optional): JSON file of jobs known to have no data.
+      Without it, weekends and holidays are still skipped but nothing is persisted.
+    - empty_date_policy (str): SKIP_EMPTY_DATES or PROBE_EMPTY_DATES_LAST.
+    - reverify_empty_dates (bool): Fetch every job, even those expected to be empty.
+    - report_types (iterable): RPTTYPE values to fetch in the same session.
+    - combined_output (bool): With several report types, add a 'Report Type'
+      column so the per-type spool files can be merged into one report.
+    - budget (FetchBudget, optional): Per-stage timeouts and the run deadline.
+    - summary (RunSummary, optional): Filled with deferred jobs and jobs that missed the budget.
+    - staging (MemoryStaging or DiskStaging, optional): Backend holding the spool files.
+    - claims (ClaimTable, optional): Claim table shared with other workers.
+    - timings (PageTimings, optional): Learned waits and scroll positions; saved
+      to its file when the run ends.
+
+    Returns:
+    - int: Total number of rows written to the spool files.
+
+    Notes:
+    - With spool files on disk (no staging, or a DiskStaging backend), memory
+      use is bounded by max_rows_in_flight regardless of the date range; a
+      MemoryStaging backend keeps the whole spool in memory instead.
+    - At most one downloaded file exists on disk at a time.
+    - Jobs finish out of date order when the site is busy, a job is deferred,
+      or expected-empty jobs are probed last; merging the run files by date
+      restores the order.
+    """
+    if staging is None:
+        os.makedirs(os.path.dirname(os.path.abspath(spool_file)), exist_ok=True)
+    opener = staging.open if staging is not None else open
+    report_types = list(report_types)
+    per_type = len(report_types) > 1
+    no_data_dates = load_no_data_calendar(calendar_file) if calendar_file else set()
+    report_jobs, avoided = schedule_report_jobs(
+        iter_report_jobs(start_date, end_date, report_types),
+        no_data_dates,
+        empty_date_policy,
+        reverify_empty_dates,
+    )
+    print_the_output_statement(
+        output, f"Skipped {avoided} dates known to have no applications."
+    )
+
+    total_rows = 0
+    # Current run and last report date written of every spool file
+    spool_runs = {}
+    try:
+        async for report_type, report_date, csv_file in fetch_report_files(
+            page,
+            report_jobs,
+            pageurl,
+            source_file,
+            output,
+            no_data_dates,
+            budget,
+            summary,
+            claims,
+            timings,
+        ):
+            rows = normalize_rows(
+                parse_report_rows(csv_file),
+                report_date,
+                report_type if per_type and combined_output else None,
+            )
+            target = (
+                report_spool_file(spool_file, report_type) if per_type else spool_file
+            )
+            run, last_date = spool_runs.get(target, (0, None))
+            if last_date is not None and report_date < last_date:
+                run += 1
+            written = append_rows_to_csv(
+                rows, spool_run_file(target, run), max_rows_in_flight, opener
+            )
+            if written:
+                spool_runs[target] = (run, report_date)
+            total_rows += written
+    finally:
+        if calendar_file:
+            save_no_data_calendar(calendar_file, no_data_dates)
+        if timings is not None:
+            timings.save()
+    return total_rows
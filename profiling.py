@@ -0,0 +1,125 @@
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+# Seconds between two stack samples of the profiled thread
+SAMPLE_INTERVAL = 0.005
+# Number of allocation sites listed per profiled section
+TOP_ALLOCATIONS = 25
+
+
+def _frame_label(frame):
+    """
+    Returns the flamegraph label of a stack frame, e.g. 'page_load (utils.py:86)'.
+    """
+    code = frame.f_code
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+class RunProfiler:
+    """
+    Sampling CPU profiler and tracemalloc allocation tracker for report runs.
+
+    Sections of a run are wrapped with section(); the samples of all sections
+    are accumulated and written by write_reports(). A disabled profiler costs
+    nothing, so callers can always wrap their code.
+
+    Time spent waiting on Chrome shows up under the event loop's select call,
+    DevTools round trips under the pyppeteer connection frames, and Python
+    transform code under the utils and pipeline frames.
+    """
+
+    def __init__(
+        self, enabled=True, sample_interval=SAMPLE_INTERVAL, top_n=TOP_ALLOCATIONS
+    ):
+        self.enabled = enabled
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        self.stacks = Counter()
+        self.allocations = []
+
+    def _sample(self, thread_id, stop_event):
+        while not stop_event.wait(self.sample_interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    @contextmanager
+    def section(self, name):
+        """
+        Profiles the calling thread while the with-block runs.
+
+        Parameters:
+        - name (str): Section name used in the allocation report.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        stop_event = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample,
+            args=(threading.get_ident(), stop_event),
+            daemon=True,
+        )
+        tracemalloc.start()
+        sampler.start()
+        try:
+            yield
+        finally:
+            stop_event.set()
+            sampler.join()
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, __file__),
+                ]
+            )
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.allocations.append(
+                (name, peak, snapshot.statistics("lineno")[: self.top_n])
+            )
+
+    def write_reports(self, report_path):
+        """
+        Writes the collapsed-stack and allocation reports next to a report file.
+
+        Parameters:
+        - report_path (str): Path of the generated report; the profiles are
+          written as '<report_path>.collapsed.txt' and '<report_path>.alloc.txt'.
+
+        Returns:
+        - list: Paths of the written files, empty if profiling is disabled.
+        """
+        if not self.enabled:
+            return []
+
+        collapsed_file = f"{report_path}.collapsed.txt"
+        with open(collapsed_file, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        alloc_file = f"{report_path}.alloc.txt"
+        with open(alloc_file, "w", encoding="utf-8") as f:
+            for name, peak, statistics in self.allocations:
+                f.write(f"# section: {name}  peak: {peak / 1024:.1f} KiB\n")
+                for stat in statistics:
+                    frame = stat.traceback[0]
+                    f.write(
+                        f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  "
+                        f"{frame.filename}:{frame.lineno}\n"
+                    )
+                f.write("\n")
+
+        print(f"Profiles written to {collapsed_file} and {alloc_file}")
+        return [collapsed_file, alloc_file]
@@ -0,0 +1,155 @@
+import json
+import os
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from utils import NEW_APPLICATIONS_REPORT
+
+# Policies for dates that are expected to have no applications
+SKIP_EMPTY_DATES = "skip"  # Do not navigate to them at all
+PROBE_EMPTY_DATES_LAST = "last"  # Navigate to them after every other date
+
+
+def _nth_weekday(year, month, weekday, n):
+    """
+    Returns the n-th given weekday of a month (n=-1 for the last one).
+    """
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year, month + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+@lru_cache(maxsize=None)
+def california_state_holidays(year):
+    """
+    Computes the California state holidays observed in a year.
+
+    Parameters:
+    - year (int): Calendar year.
+
+    Returns:
+    - frozenset: datetime.date objects of the observed holidays.
+
+    Notes:
+    - Holidays falling on a Sunday are observed on the following Monday.
+      Saturday holidays are not moved for state offices.
+    """
+    holidays = [
+        date(year, 1, 1),  # New Year's Day
+        _nth_weekday(year, 1, 0, 3),  # Martin Luther King Jr. Day
+        date(year, 2, 12),  # Lincoln's Birthday
+        _nth_weekday(year, 2, 0, 3),  # Presidents' Day
+        date(year, 3, 31),  # Cesar Chavez Day
+        _nth_weekday(year, 5, 0, -1),  # Memorial Day
+        date(year, 7, 4),  # Independence Day
+        _nth_weekday(year, 9, 0, 1),  # Labor Day
+        _nth_weekday(year, 9, 4, 4),  # Native American Day
+        date(year, 11, 11),  # Veterans Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving Day
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),  # Day after Thanksgiving
+        date(year, 12, 25),  # Christmas Day
+    ]
+    return frozenset(
+        holiday + timedelta(days=1) if holiday.weekday() == 6 else holiday
+        for holiday in holidays
+    )
+
+
+def is_closed_day(report_date):
+    """
+    Returns True if report_date is a weekend or a California state holiday.
+    """
+    if isinstance(report_date, datetime):
+        report_date = report_date.date()
+    return report_date.weekday() >= 5 or report_date in california_state_holidays(
+        report_date.year
+    )
+
+
+def no_data_key(report_type, report_date):
+    """
+    Returns the calendar key of a report job, e.g. '2:2024-03-01'.
+    """
+    return f"{report_type}:{report_date.strftime('%Y-%m-%d')}"
+
+
+def load_no_data_calendar(calendar_file):
+    """
+    Loads the persisted set of report jobs that returned no data.
+
+    Parameters:
+    - calendar_file (str): Path to the JSON calendar file.
+
+    Returns:
+    - set: Keys from no_data_key. Empty if the file is missing or unreadable.
+      Plain ISO dates from older calendars are read as New Applications keys.
+    """
+    try:
+        with open(calendar_file, "r") as f:
+            return {
+                key if ":" in key else f"{NEW_APPLICATIONS_REPORT}:{key}"
+                for key in json.load(f)
+            }
+    except FileNotFoundError:
+        return set()
+    except (OSError, ValueError) as e:
+        print(f"Error reading no-data calendar '{calendar_file}': {e}")
+        return set()
+
+
+def save_no_data_calendar(calendar_file, no_data_dates):
+    """
+    Persists the set of report jobs that returned no data.
+
+    Parameters:
+    - calendar_file (str): Path to the JSON calendar file.
+    - no_data_dates (set): Keys from no_data_key.
+    """
+    directory = os.path.dirname(os.path.abspath(calendar_file))
+    os.makedirs(directory, exist_ok=True)
+    temp_file = f"{calendar_file}.tmp"
+    with open(temp_file, "w") as f:
+        json.dump(sorted(no_data_dates), f, indent=4)
+    os.replace(temp_file, calendar_file)
+
+
+def schedule_report_jobs(
+    report_jobs, no_data_dates, policy=SKIP_EMPTY_DATES, reverify=False
+):
+    """
+    Orders report jobs so that jobs expected to be empty are skipped or probed last.
+
+    Parameters:
+    - report_jobs (iterable): (report_type, report_date) tuples in fetch order.
+    - no_data_dates (set): Keys from no_data_key of jobs that returned no data.
+    - policy (str): SKIP_EMPTY_DATES or PROBE_EMPTY_DATES_LAST.
+    - reverify (bool): If True, every job is fetched in its normal order.
+
+    Returns:
+    - tuple: A tuple containing:
+        - list: Report jobs to fetch, in fetch order.
+        - int: Number of navigations avoided by skipping jobs.
+
+    Notes:
+    - A job is expected to be empty if it is in no_data_dates, or if its date
+      is on a weekend or on a California state holiday.
+    """
+    report_jobs = list(report_jobs)
+    if reverify:
+        return report_jobs, 0
+
+    scheduled = []
+    expected_empty = []
+    for report_type, report_date in report_jobs:
+        if no_data_key(report_type, report_date) in no_data_dates or is_closed_day(
+            report_date
+        ):
+            expected_empty.append((report_type, report_date))
+        else:
+            scheduled.append((report_type, report_date))
+
+    if policy == PROBE_EMPTY_DATES_LAST:
+        return scheduled + expected_empty, 0
+    return scheduled, len(expected_empty)
@@ -0,0 +1,157 @@
+import os
+import shutil
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+
+CLAIMS_DB_NAME = "claims.sqlite3"
+CLAIM_RESULTS_FOLDER = "results"
+# Seconds a finished fetch is reused by other workers before it is fetched again
+CLAIM_RESULT_TTL = 900
+# Seconds added to the job timeout before an unfinished claim may be taken over
+CLAIM_LEASE_MARGIN = 30
+# Seconds to wait before checking again when every queued job is claimed elsewhere
+CLAIM_POLL_INTERVAL = 2
+
+# Claim states
+FETCHING = "fetching"
+DATA = "data"
+EMPTY = "empty"
+BUSY = "busy"
+
+
+class ClaimTable:
+    """
+    SQLite claim table that lets one worker at a time fetch a (report type, date).
+
+    Workers sharing the same folder (GUI runs, the service scheduler) claim a
+    job before fetching it. The first claim wins; other workers see the job as
+    busy until the winner completes it, then reuse the downloaded CSV it left
+    in the results folder instead of scraping the date again. A claim whose
+    worker died expires after its lease.
+
+    The table uses SQLite's WAL journal, which needs shared memory between the
+    workers: the folder must be on a local disk and shared by workers of one
+    machine only, never on a network share. Workers on several machines use
+    the work queue coordinator instead.
+    """
+
+    def __init__(self, shared_dir, result_ttl=CLAIM_RESULT_TTL, owner=None):
+        self.shared_dir = shared_dir
+        self.result_ttl = result_ttl
+        self.owner = (
+            owner or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        )
+        self.db_path = os.path.join(shared_dir, CLAIMS_DB_NAME)
+        os.makedirs(shared_dir, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS claims (
+                    report_type INTEGER NOT NULL,
+                    report_date TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    expires REAL NOT NULL,
+                    expected_rows INTEGER,
+                    PRIMARY KEY (report_type, report_date)
+                )
+                """
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def result_path(self, report_type, report_date):
+        """
+        Returns the path of the shared CSV of a finished job.
+        """
+        return os.path.join(
+            self.shared_dir,
+            CLAIM_RESULTS_FOLDER,
+            str(report_type),
+            f"{report_date:%Y-%m-%d}.csv",
+        )
+
+    def claim(self, report_type, report_date, lease):
+        """
+        Claims a job for this worker unless another worker holds or recently finished it.
+
+        Parameters:
+        - report_type (int): RPTTYPE of the job.
+        - report_date (datetime.datetime): Report date of the job.
+        - lease (float): Seconds the claim is held before other workers may take it over.
+
+        Returns:
+        - tuple: (state, expected_rows) where state is FETCHING if this worker
+          now holds the claim, BUSY if another worker is fetching the job, or
+          DATA / EMPTY if another worker finished it within result_ttl.
+        """
+        key = (report_type, f"{report_date:%Y-%m-%d}")
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT owner, state, expires, expected_rows FROM claims"
+                " WHERE report_type = ? AND report_date = ?",
+                key,
+            ).fetchone()
+            if row is not None and row[2] > now and row[0] != self.owner:
+                conn.execute("COMMIT")
+                state = BUSY if row[1] == FETCHING else row[1]
+                return state, row[3]
+            conn.execute(
+                "INSERT OR REPLACE INTO claims VALUES (?, ?, ?, ?, ?, NULL)",
+                (*key, self.owner, FETCHING, now + lease),
+            )
+            conn.execute("COMMIT")
+            return FETCHING, None
+
+    def complete(self, report_type, report_date, source_file=None, expected_rows=None):
+        """
+        Marks a claimed job finished and shares its result with other workers.
+
+        Parameters:
+        - report_type (int): RPTTYPE of the job.
+        - report_date (datetime.datetime): Report date of the job.
+        - source_file (str, optional): Downloaded CSV; None if the job had no data.
+        - expected_rows (int, optional): Table entry count of the download.
+        """
+        state = EMPTY
+        if source_file is not None:
+            # Copy under a temporary name first so waiters never read a partial file
+            result_file = self.result_path(report_type, report_date)
+            os.makedirs(os.path.dirname(result_file), exist_ok=True)
+            temp_file = f"{result_file}.{self.owner}.tmp"
+            shutil.copyfile(source_file, temp_file)
+            os.replace(temp_file, result_file)
+            state = DATA
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE claims SET state = ?, expires = ?, expected_rows = ?"
+                " WHERE report_type = ? AND report_date = ? AND owner = ?",
+                (
+                    state,
+                    time.time() + self.result_ttl,
+                    expected_rows,
+                    report_type,
+                    f"{report_date:%Y-%m-%d}",
+                    self.owner,
+                ),
+            )
+
+    def release(self, report_type, report_date):
+        """
+        Gives up a claim without a result, so another worker may fetch the job.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "DELETE FROM claims WHERE report_type = ? AND report_date = ? AND owner = ?",
+                (report_type, f"{report_date:%Y-%m-%d}", self.owner),
+            )
+
+    def __repr__(self):
+        return f"ClaimTable({self.shared_dir!r}, owner={self.owner!r})"
@@ -0,0 +1,648 @@
+import argparse
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Thread
+from urllib.parse import parse_qs, urlparse
+
+from pipeline import (
+    FetchBudget,
+    RunSummary,
+    fetch_report_files,
+    iter_report_jobs,
+    normalize_rows,
+    parse_report_rows,
+    prepare_download_page,
+)
+from page_timings import PageTimings
+from profiling import RunProfiler
+from report_claims import ClaimTable
+from report_calendar import (
+    load_no_data_calendar,
+    no_data_key,
+    save_no_data_calendar,
+    schedule_report_jobs,
+)
+from report_store import (
+    STORE_DATE_FORMAT,
+    iter_stored_records,
+    store_path,
+    store_report_day,
+    stored_dates,
+)
+from utils import (
+    NEW_APPLICATIONS_REPORT,
+    delete_file,
+    get_default_download_path,
+    print_the_output_statement,
+)
+from webdriver import (
+    close_browser_context,
+    open_browser_context,
+    pyppeteerBrowserConnect,
+    pyppeteerBrowserInit,
+)
+
+
+# Service Settings
+SERVICE_HOST = "127.0.0.1"  # Interface the HTTP API listens on
+SERVICE_PORT = 8765  # Port the HTTP API listens on
+STORE_FOLDER = "report_store"  # Local store of normalized per-date reports
+NO_DATA_CALENDAR_NAME = "no_data_calendar.json"  # Calendar file inside the store
+CLAIMS_FOLDER_NAME = "claims"  # Claim table shared with other workers, inside the store
+PAGE_TIMINGS_NAME = "page_timings.json"  # Learned waits and scrolls, inside the store
+SCHEDULE_INTERVAL = 3600  # Seconds between checks for newly eligible report dates
+LOOKBACK_DAYS = 30  # How many past days the scheduler keeps complete
+REFETCH_DAYS = 3  # Recent days fetched again on every refresh to catch late corrections
+REFRESH_DEADLINE = 1800  # Seconds a refresh may run before the rest waits for the next
+BROWSER_CHECK_TIMEOUT = 10  # Seconds the browser has to answer a health check
+BROWSER_RESTART_DELAY = 60  # Seconds before refreshing again with a restarted browser
+STREAM_BATCH_ROWS = 500  # Rows encoded per chunk of a streamed response
+REPORT_TYPES = (NEW_APPLICATIONS_REPORT,)  # RPTTYPE values kept in the store
+
+# Browser Settings
+HEADLESS = True  # Whether to run the browser in headless mode
+PAGE_URL = "https://www.abc.ca.gov/licensing/licensing-reports/new-applications/"  # URL for licensing reports
+BROWSER_WIDTH = 1920  # Viewport width of the warm browser
+BROWSER_HEIGHT = 1080  # Viewport height of the warm browser
+
+
+def eligible_report_jobs(
+    store_dir, lookback_days, report_types, refetch_days=0, today=None
+):
+    """
+    Lists the (report_type, report_date) jobs the scheduler should fetch.
+
+    Parameters:
+    - store_dir (str): Root folder of the local report store.
+    - lookback_days (int): Number of past days to keep complete.
+    - report_types (iterable): RPTTYPE values kept in the store.
+    - refetch_days (int): Number of most recent days fetched even if stored.
+    - today (datetime.datetime, optional): Reference date, defaults to now.
+
+    Returns:
+    - list: Jobs up to yesterday that are not in the store yet or fall within
+      the refetch window, in date order.
+    """
+    today = today or datetime.now()
+    today = datetime(today.year, today.month, today.day)
+    start_date = today - timedelta(days=lookback_days)
+    end_date = today - timedelta(days=1)
+    stored = {
+        (report_type, report_date)
+        for report_type in report_types
+        for report_date in stored_dates(store_dir, start_date, end_date, report_type)
+    }
+    refetch_from = today - timedelta(days=refetch_days)
+    return [
+        job
+        for job in iter_report_jobs(start_date, end_date, report_types)
+        if job not in stored or job[1] >= refetch_from
+    ]
+
+
+async def refresh_store(
+    page,
+    store_dir,
+    pageurl,
+    source_file,
+    lookback_days,
+    report_types=REPORT_TYPES,
+    refetch_days=REFETCH_DAYS,
+    claims=None,
+    timings=None,
+    summary=None,
+):
+    """
+    Fetches every newly eligible report job into the store.
+
+    Parameters:
+    - page: Puppeteer page object prepared with prepare_download_page.
+    - store_dir (str): Root folder of the local report store.
+    - pageurl (str): Base URL for the licensing report page.
+    - source_file (str): Path the browser saves the CSV export to.
+    - lookback_days (int): Number of past days to keep complete.
+    - report_types (iterable): RPTTYPE values kept in the store.
+    - refetch_days (int): Number of most recent days fetched even if stored.
+    - claims (ClaimTable, optional): Claim table shared with other workers.
+    - timings (PageTimings, optional): Learned waits and scroll positions; saved
+      to its file after the refresh.
+    - summary (RunSummary, optional): Filled with deferred and missed jobs.
+
+    Returns:
+    - int: Number of report days written to the store. Refetched days whose
+      content hash did not change are not rewritten and not counted.
+
+    Notes:
+    - Days in the refetch window are fetched even if the no-data calendar lists
+      them, since they may have been fetched before the site published them.
+      A stored day that comes back empty is stored empty, with a delta of the
+      removed rows.
+    """
+    calendar_file = os.path.join(store_dir, NO_DATA_CALENDAR_NAME)
+    no_data_dates = load_no_data_calendar(calendar_file)
+    today = datetime.now()
+    refetch_from = datetime(today.year, today.month, today.day) - timedelta(
+        days=refetch_days
+    )
+    eligible_jobs = eligible_report_jobs(
+        store_dir, lookback_days, report_types, refetch_days, today
+    )
+    recent_jobs = [job for job in eligible_jobs if job[1] >= refetch_from]
+    for report_type, report_date in recent_jobs:
+        no_data_dates.discard(no_data_key(report_type, report_date))
+    older_jobs, avoided = schedule_report_jobs(
+        [job for job in eligible_jobs if job[1] < refetch_from], no_data_dates
+    )
+    recent_jobs, recent_avoided = schedule_report_jobs(recent_jobs, no_data_dates)
+    report_jobs = older_jobs + recent_jobs
+    avoided += recent_avoided
+    print(f"Refreshing report store: {len(report_jobs)} jobs due, {avoided} skipped")
+
+    fetched = 0
+    summary = summary if summary is not None else RunSummary()
+    try:
+        async for report_type, report_date, csv_file in fetch_report_files(
+            page,
+            report_jobs,
+            pageurl,
+            source_file,
+            None,
+            no_data_dates,
+            FetchBudget(run_deadline=REFRESH_DEADLINE),
+            summary,
+            claims,
+            timings,
+        ):
+            status = store_report_day(
+                store_dir,
+                report_date,
+                lambda: normalize_rows(parse_report_rows(csv_file), report_date),
+                report_type,
+            )
+            fetched += status != "unchanged"
+
+        # Jobs now in the calendar came back empty in this refresh
+        for report_type, report_date in recent_jobs:
+            if no_data_key(
+                report_type, report_date
+            ) in no_data_dates and os.path.exists(
+                store_path(store_dir, report_date, report_type)
+            ):
+                status = store_report_day(
+                    store_dir, report_date, lambda: iter(()), report_type
+                )
+                fetched += status != "unchanged"
+    finally:
+        save_no_data_calendar(calendar_file, no_data_dates)
+        if timings is not None:
+            timings.save()
+        for line in summary.lines():
+            print(line)
+    return fetched
+
+
+def run_scheduler(
+    store_dir,
+    interval,
+    lookback_days,
+    stop_event,
+    browser_endpoint=None,
+    profile=False,
+    report_types=REPORT_TYPES,
+    refetch_days=REFETCH_DAYS,
+    claims_dir=None,
+):
+    """
+    Keeps a warm browser and refreshes the store every interval seconds until stopped.
+
+    Parameters:
+    - store_dir (str): Root folder of the local report store.
+    - interval (float): Seconds between refreshes.
+    - lookback_days (int): Number of past days to keep complete.
+    - stop_event (threading.Event): Set to stop the scheduler.
+    - browser_endpoint (str, optional): Shared browser to use instead of launching one.
+    - profile (bool): Write CPU and allocation profiles of every refresh into the store.
+    - report_types (iterable): RPTTYPE values kept in the store.
+    - refetch_days (int): Number of most recent days fetched again on every refresh.
+    - claims_dir (str, optional): Folder of the claim table shared with other
+      workers; defaults to a folder inside the store.
+
+    Notes:
+    - The browser is restarted (or reconnected) when it disconnects, when a
+      refresh fails, or when a refresh missed jobs and the page no longer
+      answers a health check.
+    """
+    claims = ClaimTable(claims_dir or os.path.join(store_dir, CLAIMS_FOLDER_NAME))
+    timings = PageTimings(os.path.join(store_dir, PAGE_TIMINGS_NAME))
+    loop = asyncio.new_event_loop()
+
+    download_path = get_default_download_path()
+    if browser_endpoint:
+        # Jobs sharing a browser must not download into the same file
+        download_path = os.path.join(download_path, f"abc-report-{os.getpid()}")
+    source_file = f"{download_path}/CA-ABC-LicenseReport.csv"
+    delete_file(source_file) if os.path.exists(source_file) else ""
+
+    # Set when the browser process dies or the shared browser's connection drops
+    disconnected = Event()
+
+    def start_browser():
+        disconnected.clear()
+        if browser_endpoint:
+            browser = pyppeteerBrowserConnect(loop, browser_endpoint)
+        else:
+            browser = pyppeteerBrowserInit(
+                loop, HEADLESS, BROWSER_WIDTH, BROWSER_HEIGHT
+            )
+        if browser is None:
+            return None
+        browser.on("disconnected", disconnected.set)
+
+        async def open_page():
+            context = (
+                await open_browser_context(browser, browser_endpoint)
+                if browser_endpoint
+                else browser
+            )
+            page = await context.newPage()
+            await prepare_download_page(
+                page, download_path, BROWSER_WIDTH, BROWSER_HEIGHT
+            )
+            return context, page
+
+        try:
+            context, page = loop.run_until_complete(open_page())
+        except Exception as e:
+            print(f"Error opening a page in the browser: {e}")
+            stop_browser((browser, None, None))
+            return None
+        return browser, context, page
+
+    def stop_browser(session):
+        browser, context, _ = session
+        try:
+            if browser_endpoint:
+                if context is not None:
+                    loop.run_until_complete(
+                        close_browser_context(context, browser_endpoint)
+                    )
+                loop.run_until_complete(browser.disconnect())
+            else:
+                loop.run_until_complete(browser.close())
+        except Exception as e:
+            print(f"Error closing the browser: {e}")
+
+    async def browser_responds(page):
+        try:
+            await asyncio.wait_for(page.evaluate("1"), BROWSER_CHECK_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    session = None
+    try:
+        while not stop_event.is_set():
+            if session is None:
+                session = start_browser()
+                if session is None:
+                    print("The browser could not be started, retrying later.")
+                    stop_event.wait(BROWSER_RESTART_DELAY)
+                    continue
+            profiler = RunProfiler(enabled=profile)
+            summary = RunSummary()
+            try:
+                with profiler.section("refresh"):
+                    fetched = loop.run_until_complete(
+                        refresh_store(
+                            session[2],
+                            store_dir,
+                            PAGE_URL,
+                            source_file,
+                            lookback_days,
+                            report_types,
+                            refetch_days,
+                            claims,
+                            timings,
+                            summary,
+                        )
+                    )
+                print(f"Report store refreshed: {fetched} new dates")
+                profiler.write_reports(
+                    os.path.join(store_dir, f"refresh_{datetime.now():%Y%m%d_%H%M%S}")
+                )
+                # Per-job errors are absorbed by the fetch stage, so a dead
+                # browser only shows as missed jobs
+                healthy = not disconnected.is_set() and (
+                    not summary.missed
+                    or loop.run_until_complete(browser_responds(session[2]))
+                )
+            except Exception as e:
+                print(f"Error refreshing report store: {e}")
+                healthy = False
+
+            if not healthy:
+                # Start over with a new browser, or a new connection to the shared one
+                print("The browser is not responding, restarting it.")
+                stop_browser(session)
+                session = None
+                stop_event.wait(BROWSER_RESTART_DELAY)
+            else:
+                stop_event.wait(interval)
+    finally:
+        if session is not None:
+            stop_browser(session)
+        loop.close()
+
+
+def _column_key(name):
+    """
+    Normalizes a column or query parameter name, e.g. 'License Type' -> 'licensetype'.
+    """
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def filter_records(records, filters):
+    """
+    Keeps only the records whose columns match every filter.
+
+    Parameters:
+    - records (iterable): LicenseRecord rows.
+    - filters (dict): Normalized column key -> set of accepted lower-case values.
+
+    Yields:
+    - LicenseRecord: Matching records.
+    """
+    for record in records:
+        columns = {_column_key(field): i for i, field in enumerate(record.header)}
+        if all(
+            key in columns and record.values[columns[key]].lower() in accepted
+            for key, accepted in filters.items()
+        ):
+            yield record
+
+
+def report_etag(store_dir, report_dates, query, report_type=NEW_APPLICATIONS_REPORT):
+    """
+    Computes an ETag for a report response from the stored files and the query.
+
+    Parameters:
+    - store_dir (str): Root folder of the local report store.
+    - report_dates (list): Dates included in the response.
+    - query (str): Normalized query string.
+    - report_type (int): RPTTYPE of the report.
+
+    Returns:
+    - str: A quoted ETag that changes whenever a stored day is rewritten.
+    """
+    digest = hashlib.sha1(query.encode("utf-8"))
+    for report_date in report_dates:
+        stat = os.stat(store_path(store_dir, report_date, report_type))
+        digest.update(
+            f"{report_date:%Y-%m-%d}:{stat.st_size}:{stat.st_mtime_ns};".encode()
+        )
+    return f'"{digest.hexdigest()}"'
+
+
+def encode_csv(records):
+    """
+    Encodes records as CSV text chunks, using the header of the first record.
+
+    Yields:
+    - str: CSV text of up to STREAM_BATCH_ROWS rows.
+    """
+    fieldnames = None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for count, record in enumerate(records, 1):
+        if fieldnames is None:
+            fieldnames = record.header
+            writer.writerow(fieldnames)
+        writer.writerow(record.values_for(fieldnames))
+        if count % STREAM_BATCH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def encode_json(records):
+    """
+    Encodes records as chunks of a JSON array of objects.
+
+    Yields:
+    - str: JSON text of up to STREAM_BATCH_ROWS objects.
+    """
+    parts = ["["]
+    for count, record in enumerate(records, 1):
+        parts.append(("," if count > 1 else "") + json.dumps(record.as_dict()))
+        if count % STREAM_BATCH_ROWS == 0:
+            yield "\n".join(parts)
+            parts = [""]
+    parts.append("]")
+    yield "\n".join(parts)
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves merged reports from the local store.
+
+    Endpoints:
+    - GET /dates?report_type=N: JSON list of the stored report dates.
+    - GET /reports?start=YYYY-MM-DD&end=YYYY-MM-DD&format=csv|json&report_type=N&<column>=<value>:
+      the stored rows of the range, filtered on any column (e.g. status=ACTIVE,
+      license_type=41), streamed with chunked encoding.
+    - GET /timings: JSON of the waits and scroll positions the scraper uses, the
+      learned and pinned values and the samples they were learned from.
+
+    report_type defaults to New Applications.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            report_type = int(query.get("report_type", [NEW_APPLICATIONS_REPORT])[-1])
+        except ValueError:
+            self.send_error(400, "report_type must be a number")
+            return
+
+        if url.path == "/dates":
+            dates = [
+                report_date.strftime(STORE_DATE_FORMAT)
+                for report_date in stored_dates(
+                    self.server.store_dir, report_type=report_type
+                )
+            ]
+            self._send_stream("application/json", [json.dumps(dates)])
+        elif url.path == "/reports":
+            self._send_report(query, report_type)
+        elif url.path == "/timings":
+            timings = PageTimings(
+                os.path.join(self.server.store_dir, PAGE_TIMINGS_NAME)
+            )
+            self._send_stream("application/json", [json.dumps(timings.as_dict())])
+        else:
+            self.send_error(404, "Unknown endpoint")
+
+    def _send_report(self, query, report_type):
+        start_date = query.get("start", [""])[-1]
+        end_date = query.get("end", [""])[-1]
+        try:
+            start_date = start_date and datetime.strptime(start_date, STORE_DATE_FORMAT)
+            end_date = end_date and datetime.strptime(end_date, STORE_DATE_FORMAT)
+        except ValueError:
+            self.send_error(400, "start and end must be YYYY-MM-DD")
+            return
+        file_format = query.get("format", ["csv"])[-1].lower()
+        if file_format not in ("csv", "json"):
+            self.send_error(400, "format must be csv or json")
+            return
+
+        filters = {
+            _column_key(key): {value.lower() for value in values}
+            for key, values in query.items()
+            if key not in ("start", "end", "format", "report_type")
+        }
+
+        report_dates = stored_dates(
+            self.server.store_dir, start_date, end_date, report_type
+        )
+        etag = report_etag(
+            self.server.store_dir,
+            report_dates,
+            json.dumps(sorted((k, sorted(v)) for k, v in query.items())),
+            report_type,
+        )
+        if_none_match = self.headers.get("If-None-Match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        records = filter_records(
+            iter_stored_records(
+                self.server.store_dir, start_date, end_date, report_type
+            ),
+            filters,
+        )
+        if file_format == "json":
+            self._send_stream("application/json", encode_json(records), etag)
+        else:
+            self._send_stream("text/csv; charset=utf-8", encode_csv(records), etag)
+
+    def _send_stream(self, content_type, chunks, etag=None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        for chunk in chunks:
+            body = chunk.encode("utf-8")
+            if body:
+                self.wfile.write(f"{len(body):X}\r\n".encode("ascii") + body + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def main():
+    """
+    Runs the report service: the HTTP API and, unless offline, the scrape scheduler.
+    """
+    parser = argparse.ArgumentParser(description="ABC licensing report service")
+    parser.add_argument(
+        "--store", default=STORE_FOLDER, help="Local report store folder"
+    )
+    parser.add_argument("--host", default=SERVICE_HOST, help="HTTP API interface")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT, help="HTTP API port")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=SCHEDULE_INTERVAL,
+        help="Seconds between scheduled refreshes",
+    )
+    parser.add_argument(
+        "--lookback-days",
+        type=int,
+        default=LOOKBACK_DAYS,
+        help="Number of past days the scheduler keeps complete",
+    )
+    parser.add_argument(
+        "--browser-endpoint",
+        default=None,
+        help="Shared browser ('ws://' DevTools URL or 'http://' broker address)",
+    )
+    parser.add_argument(
+        "--refetch-days",
+        type=int,
+        default=REFETCH_DAYS,
+        help="Number of most recent days fetched again to catch late corrections",
+    )
+    parser.add_argument(
+        "--report-types",
+        default=",".join(str(report_type) for report_type in REPORT_TYPES),
+        help="Comma separated RPTTYPE values kept in the store",
+    )
+    parser.add_argument(
+        "--claims-dir",
+        default=None,
+        help="Claim table shared with other workers (default: <store>/claims)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write CPU and allocation profiles of every refresh into the store",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Only serve the local store, never start the browser",
+    )
+    args = parser.parse_args()
+
+    os.makedirs(args.store, exist_ok=True)
+    stop_event = Event()
+    if not args.offline:
+        scheduler_thread = Thread(
+            target=run_scheduler,
+            args=(
+                args.store,
+                args.interval,
+                args.lookback_days,
+                stop_event,
+                args.browser_endpoint,
+                args.profile,
+                [int(report_type) for report_type in args.report_types.split(",")],
+                args.refetch_days,
+                args.claims_dir,
+            ),
+            daemon=True,
+        )
+        scheduler_thread.start()
+
+    server = ThreadingHTTPServer((args.host, args.port), ReportRequestHandler)
+    server.store_dir = args.store
+    print_the_output_statement(
+        None, f"Serving reports from '{args.store}' on http://{args.host}:{args.port}"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import csv
+import hashlib
+import json
+import os
+from collections import defaultdict, deque
+from datetime import datetime
+
+from license_record import LicenseRecord, intern_header
+from utils import NEW_APPLICATIONS_REPORT
+
+# File name format of a stored report day
+STORE_DATE_FORMAT = "%Y-%m-%d"
+# Content hashes of the stored days, kept next to them in each report type folder
+DAY_HASHES_NAME = "hashes.json"
+# Column identifying a license when diffing two versions of a day
+LICENSE_KEY_FIELD = "License Number"
+
+
+def store_path(store_dir, report_date, report_type=NEW_APPLICATIONS_REPORT):
+    """
+    Returns the path of the stored CSV for a report date.
+
+    Parameters:
+    - store_dir (str): Root folder of the local report store.
+    - report_date (datetime.datetime): Report date.
+    - report_type (int): RPTTYPE of the report.
+
+    Returns:
+    - str: Path to '<store_dir>/<report_type>/<YYYY-MM-DD>.csv'.
+    """
+    return os.path.join(
+        store_dir, str(report_type), f"{report_date.strftime(STORE_DATE_FORMAT)}.csv"
+    )
+
+
+def write_report_day(store_dir, report_date, rows, report_type=NEW_APPLICATIONS_REPORT):
+    """
+    Writes the normalized rows of one report date to the store.
+
+    Parameters:
+    - store_dir (str): Root folder of the local report store.
+    - report_date (datetime.datetime): Report date.
+    - rows (iterable): Normalized LicenseRecord rows.
+    - report_type (int): RPTTYPE of the report.
+
+    Returns:
+    - int: Number of rows written.
+
+    Notes:
+    - The file is written under a temporary name and renamed into place, so
+      readers never see a partially written day.
+    """
+    output_file = store_path(store_dir, report_date, report_type)
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    temp_file = f"{output_file}.tmp"
+    written = 0
+    with open(temp_file, "w", newline="", encoding="utf-8") as outfile:
+        writer = csv.writer(outfile)
+        for row in rows:
+            if written == 0:
+                writer.writerow(row.header)
+            writer.writerow(row.values)
+            written += 1
+    os.replace(temp_file, output_file)
+    return written
+
+
+def stored_dates(
+    store_dir, start_date=None, end_date=None, report_type=NEW_APPLICATIONS_REPORT
+):
+    """
+    Lists the report dates present in the store, optionally within a range.
+
+    Parameters:
+    - store_dir (str): Root folder of the local report store.
+    - start_date (datetime.datetime, optional): First date to include.
+    - end_date (datetime.datetime, optional): Last date to include.
+    - report_type (int): RPTTYPE of the report.
+
+    Returns:
+    - list: datetime.datetime objects in ascending order.
+    """
+    try:
+        names = os.listdir(os.path.join(store_dir, str(report_type)))
+    except FileNotFoundError:
+        return []
+
+    dates = []
+    for name in names:
+        stem, extension = os.path.splitext(name)
+        if extension != ".csv":
+            continue
+        try:
+            report_date = datetime.strptime(stem, STORE_DATE_FORMAT)
+        except ValueError:
+            continue
+        if start_date and report_date < start_date:
+            continue
+        if end_date and report_date > end_date:
+            continue
+        dates.append(report_date)
+    return sorted(dates)
+
+
+def iter_stored_records(
+    store_dir, start_date=None, end_date=None, report_type=NEW_APPLICATIONS_REPORT
+):
+    """
+    Streams the stored records of a date range in date order.
+
+    Parameters:
+    - store_dir (str): Root folder of the local report store.
+    - start_date (datetime.datetime, optional): First date to include.
+    - end_date (datetime.datetime, optional): Last date to include.
+    - report_type (int): RPTTYPE of the report.
+
+    Yields:
+    - LicenseRecord: One record per stored license row.
+    """
+    for report_date in stored_dates(store_dir, start_date, end_date, report_type):
+        with open(
+            store_path(store_dir, report_date, report_type),
+            "r",
+            newline="",
+            encoding="utf-8",
+        ) as infile:
+            reader = csv.reader(infile)
+            headers = next(reader, None)
+            if headers is None:
+                continue
+            header = intern_header(headers)
+            for values in reader:
+                if values:
+                    yield LicenseRecord(header, values)
+
+
+def hash_records(records):
+    """
+    Computes the content hash of a report day from its normalized records.
+
+    Parameters:
+    - records (iterable): Normalized LicenseRecord rows.
+
+    Returns:
+    - str: Hex SHA-256 of the header and values of every record.
+    """
+    digest = hashlib.sha256()
+    header = None
+    for record in records:
+        if record.header is not header:
+            header = record.header
+            digest.update(("\x1e" + "\x1f".join(header)).encode("utf-8"))
+        digest.update(("\x1e" + "\x1f".join(record.values)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _hashes_path(store_dir, report_type):
+    return os.path.join(store_dir, str(report_type), DAY_HASHES_NAME)
+
+
+def load_day_hashes(store_dir, report_type=NEW_APPLICATIONS_REPORT):
+    """
+    Loads the content hashes of the stored days of a report type.
+
+    Returns:
+    - dict: ISO date -> hex SHA-256, empty if no hashes were stored yet.
+    """
+    try:
+        with open(_hashes_path(store_dir, report_type), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Error reading day hashes of report type {report_type}: {e}")
+        return {}
+
+
+def save_day_hashes(store_dir, day_hashes, report_type=NEW_APPLICATIONS_REPORT):
+    """
+    Persists the content hashes of the stored days of a report type.
+    """
+    hashes_file = _hashes_path(store_dir, report_type)
+    os.makedirs(os.path.dirname(hashes_file), exist_ok=True)
+    temp_file = f"{hashes_file}.tmp"
+    with open(temp_file, "w") as f:
+        json.dump(day_hashes, f, indent=4, sort_keys=True)
+    os.replace(temp_file, hashes_file)
+
+
+def diff_report_day(old_records, new_records, key_field=LICENSE_KEY_FIELD):
+    """
+    Computes the row-level changes between two versions of a report day.
+
+    Parameters:
+    - old_records (iterable): Records currently in the store.
+    - new_records (iterable): Newly downloaded normalized records.
+    - key_field (str): Column identifying a license. Rows without it are keyed
+      by their full contents, so edits show up as a removal plus an addition.
+      A license listed on several rows of a day (e.g. one row per license type)
+      is matched to an identical old row first, then to its old rows in order.
+
+    Returns:
+    - list: (change, record) tuples where change is 'added', 'removed' or 'modified'.
+    """
+
+    def row_key(record):
+        return record.get(key_field) or record.values
+
+    old_by_key = defaultdict(deque)
+    for record in old_records:
+        old_by_key[row_key(record)].append(record)
+    changes = []
+    for record in new_records:
+        old_rows = old_by_key.get(row_key(record))
+        if not old_rows:
+            changes.append(("added", record))
+            continue
+        for index, old_record in enumerate(old_rows):
+            if old_record.values_for(record.header) == record.values:
+                del old_rows[index]
+                break
+        else:
+            old_rows.popleft()
+            changes.append(("modified", record))
+    changes.extend(
+        ("removed", record) for old_rows in old_by_key.values() for record in old_rows
+    )
+    return changes
+
+
+def write_report_delta(
+    store_dir, report_date, changes, report_type=NEW_APPLICATIONS_REPORT
+):
+    """
+    Writes the row-level changes of a report day as a delta CSV file.
+
+    Parameters:
+    - store_dir (str): Root folder of the local report store.
+    - report_date (datetime.datetime): Report date.
+    - changes (list): (change, record) tuples from diff_report_day.
+    - report_type (int): RPTTYPE of the report.
+
+    Returns:
+    - str: Path to '<store_dir>/<report_type>/deltas/<YYYY-MM-DD>_<timestamp>.csv'.
+    """
+    delta_dir = os.path.join(store_dir, str(report_type), "deltas")
+    os.makedirs(delta_dir, exist_ok=True)
+    delta_file = os.path.join(
+        delta_dir,
+        f"{report_date.strftime(STORE_DATE_FORMAT)}_{datetime.now():%Y%m%d%H%M%S}.csv",
+    )
+    fieldnames = None
+    with open(delta_file, "w", newline="", encoding="utf-8") as outfile:
+        writer = csv.writer(outfile)
+        for change, record in changes:
+            if fieldnames is None:
+                fieldnames = record.header
+                writer.writerow(("Change",) + fieldnames)
+            writer.writerow((change,) + tuple(record.values_for(fieldnames)))
+    return delta_file
+
+
+def store_report_day(
+    store_dir, report_date, make_rows, report_type=NEW_APPLICATIONS_REPORT
+):
+    """
+    Stores a downloaded report day only if its content changed.
+
+    Parameters:
+    - store_dir (str): Root folder of the local report store.
+    - report_date (datetime.datetime): Report date.
+    - make_rows (callable): Returns a fresh iterator of the day's normalized
+      LicenseRecord rows; it is called once to hash and again only if the day changed.
+    - report_type (int): RPTTYPE of the report.
+
+    Returns:
+    - str: 'new', 'unchanged' or 'changed'. Changed days also get a delta file
+      from write_report_delta.
+    """
+    day_key = report_date.strftime(STORE_DATE_FORMAT)
+    day_hashes = load_day_hashes(store_dir, report_type)
+    new_hash = hash_records(make_rows())
+    day_file = store_path(store_dir, report_date, report_type)
+    exists = os.path.exists(day_file)
+
+    old_hash = day_hashes.get(day_key)
+    if old_hash is None and exists:
+        # Days stored before hashing was introduced are hashed on first comparison
+        old_hash = hash_records(
+            iter_stored_records(store_dir, report_date, report_date, report_type)
+        )
+    if exists and old_hash == new_hash:
+        print(f"Report day {day_key} (type {report_type}) is unchanged")
+        day_hashes[day_key] = new_hash
+        save_day_hashes(store_dir, day_hashes, report_type)
+        return "unchanged"
+
+    status = "new"
+    if exists:
+        changes = diff_report_day(
+            iter_stored_records(store_dir, report_date, report_date, report_type),
+            make_rows(),
+        )
+        delta_file = write_report_delta(store_dir, report_date, changes, report_type)
+        print(f"Report day {day_key} changed: {len(changes)} rows, delta {delta_file}")
+        status = "changed"
+
+    write_report_day(store_dir, report_date, make_rows(), report_type)
+    day_hashes[day_key] = new_hash
+    save_day_hashes(store_dir, day_hashes, report_type)
+    return status
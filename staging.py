@@ -0,0 +1,174 @@
+import io
+import os
+import shutil
+import tempfile
+
+# tmpfs mount used for disk staging when it is available (Linux)
+TMPFS_DIR = "/dev/shm"
+# Estimated size of one report day of intermediate data, in bytes
+ESTIMATED_BYTES_PER_DAY = 64 * 1024
+# Staging in memory requires this many times the expected size to be available
+MEMORY_HEADROOM = 4
+# Largest expected size staged in process memory; larger runs without tmpfs stage on disk
+MEMORY_STAGING_MAX_BYTES = 64 * 1024 * 1024
+
+
+class _MemoryWriter(io.StringIO):
+    """
+    Text buffer that is committed to a MemoryStaging file when closed.
+    """
+
+    def __init__(self, chunks):
+        super().__init__()
+        self._chunks = chunks
+
+    def close(self):
+        if not self.closed:
+            self._chunks.append(self.getvalue())
+        super().close()
+
+
+class _MemoryReader:
+    """
+    Line iterator over the chunks of a MemoryStaging file.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from io.StringIO(chunk, newline="")
+
+    def read(self):
+        return "".join(self._chunks)
+
+    def close(self):
+        self._chunks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MemoryStaging:
+    """
+    Keeps intermediate files in memory.
+
+    Files are stored as lists of appended text chunks, so appending a day to a
+    spool file never copies what was staged before.
+    """
+
+    download_dir = None  # The browser still downloads into the default folder
+
+    def __init__(self):
+        self._files = {}
+
+    def open(self, name, mode="r", **kwargs):
+        """
+        Opens a staged file by name; supports the text modes 'r', 'w' and 'a'.
+        """
+        if mode.startswith("r"):
+            if name not in self._files:
+                raise FileNotFoundError(f"Staged file not found: '{name}'")
+            return _MemoryReader(self._files[name])
+        if mode.startswith("w"):
+            self._files[name] = []
+        return _MemoryWriter(self._files.setdefault(name, []))
+
+    def exists(self, name):
+        """
+        Returns True if a file with this name has been staged.
+        """
+        return name in self._files
+
+    def cleanup(self):
+        """
+        Discards every staged file.
+        """
+        self._files.clear()
+
+    def __repr__(self):
+        return "MemoryStaging()"
+
+
+class DiskStaging:
+    """
+    Keeps intermediate files in a private folder on tmpfs or local disk.
+
+    The browser downloads into the same folder, so downloads never touch the
+    working directory either.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.download_dir = root
+        os.makedirs(root, exist_ok=True)
+
+    def open(self, name, mode="r", **kwargs):
+        """
+        Opens a staged file by name, with the same arguments as open().
+        """
+        return open(os.path.join(self.root, name), mode, **kwargs)
+
+    def exists(self, name):
+        """
+        Returns True if a file with this name has been staged.
+        """
+        return os.path.exists(os.path.join(self.root, name))
+
+    def cleanup(self):
+        """
+        Deletes the staging folder and everything in it.
+        """
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def __repr__(self):
+        return f"DiskStaging({self.root!r})"
+
+
+def available_memory():
+    """
+    Returns the memory available to new allocations in bytes, or None if unknown.
+    """
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def create_staging(expected_bytes):
+    """
+    Chooses a staging backend for a run from the memory available.
+
+    Parameters:
+    - expected_bytes (int): Expected size of the intermediate data.
+
+    Returns:
+    - MemoryStaging or DiskStaging: tmpfs staging if there is enough memory and
+      a tmpfs mount, in-memory staging if there is enough memory but no tmpfs
+      and expected_bytes is at most MEMORY_STAGING_MAX_BYTES, otherwise
+      staging in the local temporary directory.
+    """
+    needed = expected_bytes * MEMORY_HEADROOM
+    available = available_memory()
+    if available is not None and available >= needed:
+        if os.path.isdir(TMPFS_DIR) and shutil.disk_usage(TMPFS_DIR).free >= needed:
+            staging = DiskStaging(tempfile.mkdtemp(prefix="abc-report-", dir=TMPFS_DIR))
+        elif expected_bytes <= MEMORY_STAGING_MAX_BYTES:
+            staging = MemoryStaging()
+        else:
+            staging = DiskStaging(tempfile.mkdtemp(prefix="abc-report-"))
+    else:
+        staging = DiskStaging(tempfile.mkdtemp(prefix="abc-report-"))
+    print(f"Staging intermediate files in {staging!r}")
+    return staging
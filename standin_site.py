@@ -0,0 +1,205 @@
+import argparse
+import html
+import random
+import time
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from report_calendar import is_closed_day
+from utils import NEW_APPLICATIONS_REPORT, report_type_name
+
+# Stand-in Site Settings
+SITE_HOST = "127.0.0.1"  # Interface the stand-in site listens on
+SITE_PORT = 8800  # Port the stand-in site listens on
+MAX_ROWS_PER_DAY = 40  # Upper bound of the generated rows of a report day
+REPORT_COLUMNS = (
+    "License Number",
+    "Status",
+    "License Type",
+    "Business Name",
+    "City",
+    "County",
+)
+STATUSES = ("ACTIVE", "PENDING", "SURRENDERED")
+LICENSE_TYPES = ("20", "21", "41", "47", "48")
+CITIES = (("SACRAMENTO", "SACRAMENTO"), ("FRESNO", "FRESNO"), ("OAKLAND", "ALAMEDA"))
+ASSET_BYTES = 256 * 1024  # Size of each static asset, like the site's theme files
+ASSET_MAX_AGE = 86400  # Seconds browsers may cache the static assets
+
+# Builds the CSV of the rendered table and saves it like the site's DataTables export
+DOWNLOAD_SCRIPT = """
+function downloadReport() {
+    const quote = cell => '"' + cell.textContent.replace(/"/g, '""') + '"';
+    const lines = Array.from(document.querySelectorAll('#license_report tr'))
+        .map(row => Array.from(row.children).map(quote).join(','));
+    const link = document.createElement('a');
+    link.href = URL.createObjectURL(new Blob([lines.join('\\n')], {type: 'text/csv'}));
+    link.download = 'CA-ABC-LicenseReport.csv';
+    document.body.appendChild(link);
+    link.click();
+}
+"""
+
+
+def generate_asset(content_type, line):
+    """
+    Returns an asset body of ASSET_BYTES made of a repeated line.
+    """
+    return content_type, (line * (ASSET_BYTES // len(line) + 1))[:ASSET_BYTES].encode()
+
+
+# Static assets every page loads before DOMContentLoaded, served cacheable
+ASSETS = {
+    "/assets/site.css": generate_asset(
+        "text/css", ".et_pb_code_inner { margin: 0; padding: 0; }\n"
+    ),
+    "/assets/site.js": generate_asset("text/javascript", "var siteTheme = {};\n"),
+}
+ASSET_TAGS = (
+    '<link rel="stylesheet" href="/assets/site.css">'
+    '<script src="/assets/site.js"></script>'
+)
+
+
+def generate_report_rows(report_type, report_date):
+    """
+    Returns the made-up rows of a report day; the same for every request.
+
+    Parameters:
+    - report_type (int): RPTTYPE of the report.
+    - report_date (datetime.datetime): Report date.
+
+    Returns:
+    - list: Rows of REPORT_COLUMNS values; empty on weekends and holidays.
+    """
+    if is_closed_day(report_date):
+        return []
+    rng = random.Random(f"{report_type}:{report_date:%Y-%m-%d}")
+    rows = []
+    for _ in range(rng.randint(0, MAX_ROWS_PER_DAY)):
+        city, county = rng.choice(CITIES)
+        rows.append(
+            [
+                str(rng.randint(100000, 999999)),
+                rng.choice(STATUSES),
+                rng.choice(LICENSE_TYPES),
+                f"BUSINESS {rng.randint(1, 9999)} LLC",
+                city,
+                county,
+            ]
+        )
+    return rows
+
+
+def render_report_page(report_type, report_date):
+    """
+    Renders a report page with the elements the scraper looks for.
+    """
+    rows = generate_report_rows(report_type, report_date)
+    if not rows:
+        name = report_type_name(report_type)
+        return (
+            f"<html><head>{ASSET_TAGS}</head>"
+            '<body><div class="et_pb_code_inner">'
+            f"There were no {html.escape(name)} on the selected report date."
+            "</div></body></html>"
+        )
+    header = "".join(f"<th>{html.escape(column)}</th>" for column in REPORT_COLUMNS)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{html.escape(value)}</td>" for value in row) + "</tr>"
+        for row in rows
+    )
+    return (
+        f"<html><head>{ASSET_TAGS}</head><body>"
+        '<div class="et_pb_code_inner"></div>'
+        '<div style="height: 150vh"></div>'
+        f'<table id="license_report"><thead><tr>{header}</tr></thead>'
+        f"<tbody>{body}</tbody></table>"
+        f'<div id="license_report_info">'
+        f"Showing 1 to {len(rows)} of {len(rows)} entries</div>"
+        '<button class="btn btn-default buttons-csv buttons-html5 abclqs-download-btn '
+        'et_pb_button et_pb_button_0 et_pb_bg_layout_dark" onclick="downloadReport()">'
+        "CSV</button>"
+        f"<script>{DOWNLOAD_SCRIPT}</script>"
+        "</body></html>"
+    )
+
+
+class StandinRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves made-up report pages for ?RPTTYPE=N&RPTDATE=MM/DD/YYYY on any path,
+    and the cacheable ASSETS they load.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path in ASSETS:
+            self.send_asset(url.path)
+            return
+        query = parse_qs(url.query)
+        try:
+            report_type = int(query.get("RPTTYPE", [NEW_APPLICATIONS_REPORT])[-1])
+            report_date = datetime.strptime(query["RPTDATE"][-1], "%m/%d/%Y")
+        except (KeyError, ValueError):
+            self.send_error(404, "RPTTYPE and RPTDATE=MM/DD/YYYY are required")
+            return
+        time.sleep(self.server.delay)
+        body = render_report_page(report_type, report_date).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_asset(self, path):
+        content_type, body = ASSETS[path]
+        etag = f'"{zlib.crc32(body):08x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        time.sleep(self.server.asset_delay)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", f"public, max-age={ASSET_MAX_AGE}")
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    """
+    Runs a local stand-in of the licensing report site, for trying out workers.
+    """
+    parser = argparse.ArgumentParser(description="Stand-in ABC licensing report site")
+    parser.add_argument("--host", default=SITE_HOST, help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=SITE_PORT, help="Port to listen on")
+    parser.add_argument(
+        "--delay", type=float, default=0, help="Seconds every page takes to respond"
+    )
+    parser.add_argument(
+        "--asset-delay",
+        type=float,
+        default=0,
+        help="Seconds every uncached asset takes to respond",
+    )
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), StandinRequestHandler)
+    server.delay = args.delay
+    server.asset_delay = args.asset_delay
+    print(f"Serving stand-in report pages on http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime
+
+import pipeline
+from utils import NEW_APPLICATIONS_REPORT
+
+
+def fetch_all(monkeypatch, tmp_path, fetch_report_job):
+    async def no_page_reset(page):
+        pass
+
+    monkeypatch.setattr(pipeline, "fetch_report_job", fetch_report_job)
+    monkeypatch.setattr(pipeline, "cancel_stuck_page", no_page_reset)
+    jobs = [(NEW_APPLICATIONS_REPORT, datetime(2024, 3, day)) for day in (4, 5, 6)]
+    summary = pipeline.RunSummary()
+
+    async def collect():
+        return [
+            report_date
+            async for _, report_date, _ in pipeline.fetch_report_files(
+                None, jobs, "", str(tmp_path / "download.csv"), None, summary=summary
+            )
+        ]
+
+    return asyncio.run(collect()), summary
+
+
+def test_page_error_fails_only_its_job(monkeypatch, tmp_path):
+    async def fetch_report_job(
+        page, report_type, report_date, pageurl, source_file, *args
+    ):
+        if report_date.day == 5:
+            raise IndexError("list index out of range")
+        with open(source_file, "w") as f:
+            f.write("License Number\n1\n")
+        return "data", 1
+
+    fetched, summary = fetch_all(monkeypatch, tmp_path, fetch_report_job)
+    assert [d.day for d in fetched] == [4, 6]
+    ((_, missed_date, reason),) = summary.missed
+    assert missed_date.day == 5
+    assert "IndexError" in reason
+    assert len(summary.deferred) == pipeline.MAX_JOB_ATTEMPTS - 1
+
+
+def test_failed_job_is_retried_and_then_missed(monkeypatch, tmp_path):
+    attempts = []
+
+    async def fetch_report_job(page, report_type, report_date, *args):
+        attempts.append(report_date.day)
+        return "failed", None
+
+    fetched, summary = fetch_all(monkeypatch, tmp_path, fetch_report_job)
+    assert fetched == []
+    assert len(attempts) == 3 * pipeline.MAX_JOB_ATTEMPTS
+    assert [d.day for _, d, _ in summary.missed] == [4, 5, 6]
@@ -0,0 +1,118 @@
+import csv
+import json
+import os
+
+from partitioned_output import (
+    DAY_PARTITIONS,
+    MONTH_PARTITIONS,
+    write_partitioned_report,
+)
+from utils import merge_csv_files
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def write_type_spools(folder):
+    new_applications = os.path.join(folder, "spool_1.csv")
+    status_changes = os.path.join(folder, "spool_5.csv")
+    write_csv(
+        new_applications,
+        [
+            ["License Number", "Status", "Report Date", "Report Type"],
+            ["100", "ACTIVE", "March 04, 2024", "New Applications"],
+            ["101", "ACTIVE", "March 06, 2024", "New Applications"],
+        ],
+    )
+    write_csv(
+        status_changes,
+        [
+            [
+                "License Number",
+                "Old Status",
+                "New Status",
+                "Report Date",
+                "Report Type",
+            ],
+            ["200", "PENDING", "ACTIVE", "March 05, 2024", "Status Changes"],
+        ],
+    )
+    return [new_applications, status_changes]
+
+
+def test_merge_keeps_columns_of_every_report_type(tmp_path):
+    output_file = merge_csv_files(
+        write_type_spools(tmp_path), tmp_path, "report", "csv", None
+    )
+    assert read_csv(output_file) == [
+        [
+            "License Number",
+            "Status",
+            "Report Date",
+            "Report Type",
+            "Old Status",
+            "New Status",
+        ],
+        ["100", "ACTIVE", "March 04, 2024", "New Applications", "", ""],
+        ["101", "ACTIVE", "March 06, 2024", "New Applications", "", ""],
+        ["200", "", "March 05, 2024", "Status Changes", "PENDING", "ACTIVE"],
+    ]
+
+
+def test_merge_interleaves_report_types_by_date(tmp_path):
+    output_file = merge_csv_files(
+        write_type_spools(tmp_path),
+        tmp_path,
+        "report",
+        "csv",
+        None,
+        interleave_by_date=True,
+    )
+    assert [row[0] for row in read_csv(output_file)[1:]] == ["100", "200", "101"]
+
+
+def test_partitioned_report_keeps_columns_of_every_report_type(tmp_path):
+    manifest_file = write_partitioned_report(
+        write_type_spools(tmp_path),
+        tmp_path,
+        "report",
+        DAY_PARTITIONS,
+        interleave_by_date=True,
+    )
+    with open(manifest_file, encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["columns"][-2:] == ["Old Status", "New Status"]
+    partition = next(p for p in manifest["partitions"] if "day=05" in p["path"])
+    rows = read_csv(os.path.join(tmp_path, "report", partition["path"]))
+    assert rows[1][-2:] == ["PENDING", "ACTIVE"]
+
+
+def test_partitioned_report_rerun_drops_stale_partitions(tmp_path):
+    spool = os.path.join(tmp_path, "spool.csv")
+    write_csv(
+        spool,
+        [
+            ["License Number", "Report Date"],
+            ["100", "March 04, 2024"],
+            ["101", "April 01, 2024"],
+        ],
+    )
+    write_partitioned_report([spool], tmp_path, "report", MONTH_PARTITIONS)
+    write_csv(spool, [["License Number", "Report Date"], ["102", "May 01, 2024"]])
+    manifest_file = write_partitioned_report(
+        [spool], tmp_path, "report", MONTH_PARTITIONS
+    )
+
+    with open(manifest_file, encoding="utf-8") as f:
+        assert [p["path"] for p in json.load(f)["partitions"]] == [
+            "year=2024/month=05/report.csv"
+        ]
+    assert os.listdir(os.path.join(tmp_path, "report", "year=2024")) == ["month=05"]
+    assert sorted(os.listdir(tmp_path)) == ["report", "spool.csv"]
@@ -0,0 +1,58 @@
+from page_timings import (
+    TIMING_DEFAULTS,
+    TIMING_MAXIMUMS,
+    TIMING_MIN_SAMPLES,
+    TIMING_WINDOW,
+    PageTimings,
+)
+
+
+def test_fast_samples_do_not_shrink_waits_below_defaults():
+    timings = PageTimings()
+    for _ in range(TIMING_MIN_SAMPLES):
+        timings.record("settle", 0.3)
+        timings.record("short_scroll", 0.1)
+    assert timings.value("settle") == TIMING_DEFAULTS["settle"]
+    # Scroll positions are not waits and follow the samples
+    assert timings.value("short_scroll") == 0.1
+
+
+def test_timeouts_hold_the_wait_without_compounding():
+    timings = PageTimings()
+    for _ in range(TIMING_MIN_SAMPLES):
+        timings.record("download", 10)
+    slow_wait = timings.value("download")
+    assert slow_wait > TIMING_DEFAULTS["download"]
+
+    for _ in range(TIMING_WINDOW):
+        timings.record_timeout("download", timings.value("download"))
+    assert timings.value("download") == slow_wait
+
+
+def test_waits_come_back_down_after_a_burst_of_timeouts():
+    timings = PageTimings()
+    for _ in range(TIMING_MIN_SAMPLES):
+        timings.record("download", 10)
+    for _ in range(TIMING_WINDOW):
+        timings.record_timeout("download", timings.value("download"))
+    for _ in range(TIMING_WINDOW):
+        timings.record("download", 1)
+    assert timings.value("download") == TIMING_DEFAULTS["download"]
+
+
+def test_learned_waits_are_capped(tmp_path):
+    timings_file = tmp_path / "timings.json"
+    timings = PageTimings(str(timings_file))
+    for _ in range(TIMING_MIN_SAMPLES):
+        timings.record("settle", 1563)
+        timings.record_timeout("download", 1563)
+    timings.save()
+
+    timings = PageTimings(str(timings_file))
+    assert timings.value("settle") == TIMING_MAXIMUMS["settle"]
+    assert timings.value("download") == TIMING_MAXIMUMS["download"]
+
+
+def test_pinned_wait_is_used_as_is():
+    timings = PageTimings(pinned={"download": 2})
+    assert timings.value("download") == 2
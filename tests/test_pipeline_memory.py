@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs the pipeline over a synthetic date range in a fresh interpreter and
+# prints its peak RSS, so each range is measured from the same baseline
+PIPELINE_SCRIPT = """
+import asyncio
+import csv
+import resource
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pipeline
+
+ROWS_PER_DAY = 200
+
+
+async def synthetic_fetch_report_files(page, report_jobs, pageurl, source_file, *args):
+    for report_type, report_date in report_jobs:
+        with open(source_file, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["License Number", "Status", "License Type", "Business Name"])
+            for row in range(ROWS_PER_DAY):
+                writer.writerow(
+                    [f"{report_date:%Y%m%d}{row:04d}", "ACTIVE", "41", f"Business {row}"]
+                )
+        yield report_type, report_date, source_file
+
+
+pipeline.fetch_report_files = synthetic_fetch_report_files
+days = int(sys.argv[1])
+folder = tempfile.mkdtemp()
+start_date = datetime(2000, 1, 3)
+total_rows = asyncio.run(
+    pipeline.run_report_pipeline(
+        None,
+        start_date,
+        start_date + timedelta(days=days - 1),
+        "",
+        f"{folder}/download.csv",
+        f"{folder}/spool.csv",
+        None,
+        reverify_empty_dates=True,
+    )
+)
+assert total_rows == days * ROWS_PER_DAY, total_rows
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def peak_rss(days):
+    result = subprocess.run(
+        [sys.executable, "-c", PIPELINE_SCRIPT, str(days)],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return int(result.stdout.split()[-1])
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="ru_maxrss in KiB")
+def test_peak_rss_is_flat_from_30_to_3000_days():
+    small = peak_rss(30)
+    large = peak_rss(3000)
+    # ru_maxrss is in KiB on Linux; allow 10% plus 5 MiB of noise
+    assert large <= small * 1.1 + 5 * 1024, (small, large)
@@ -0,0 +1,46 @@
+import asyncio
+import csv
+from datetime import datetime
+
+import pipeline
+from utils import NEW_APPLICATIONS_REPORT, merge_csv_files
+
+# Days in the order they finish when March 4 is re-queued and March 6 deferred
+FINISH_ORDER = [5, 7, 4, 8, 6]
+
+
+def test_spool_runs_merge_into_date_order(monkeypatch, tmp_path):
+    async def fetch_report_files(page, report_jobs, pageurl, source_file, *args):
+        for day in FINISH_ORDER:
+            with open(source_file, "w", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows([["License Number"], [str(day)]])
+            yield NEW_APPLICATIONS_REPORT, datetime(2024, 3, day), source_file
+
+    monkeypatch.setattr(pipeline, "fetch_report_files", fetch_report_files)
+    spool_file = str(tmp_path / "spool.csv")
+    total_rows = asyncio.run(
+        pipeline.run_report_pipeline(
+            None,
+            datetime(2024, 3, 4),
+            datetime(2024, 3, 8),
+            "",
+            str(tmp_path / "download.csv"),
+            spool_file,
+            None,
+        )
+    )
+    assert total_rows == len(FINISH_ORDER)
+
+    run_files = pipeline.spool_run_files(spool_file)
+    assert len(run_files) == 3
+    output_file = merge_csv_files(
+        run_files, tmp_path, "report", "csv", None, interleave_by_date=True
+    )
+    with open(output_file, newline="", encoding="utf-8") as f:
+        assert [row[0] for row in list(csv.reader(f))[1:]] == [
+            "4",
+            "5",
+            "6",
+            "7",
+            "8",
+        ]
@@ -0,0 +1,100 @@
+import json
+from datetime import datetime
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+from threading import Thread
+
+import pytest
+
+from license_record import LicenseRecord, intern_header
+from report_service import ReportRequestHandler
+from report_store import write_report_day
+
+HEADER = intern_header(["License Number", "Status", "License Type", "Report Date"])
+
+
+@pytest.fixture
+def api(tmp_path):
+    for day, rows in (
+        (4, [["100", "ACTIVE", "41"], ["101", "PENDING", "20"]]),
+        (5, [["102", "ACTIVE", "20"]]),
+    ):
+        report_date = datetime(2024, 3, day)
+        write_report_day(
+            str(tmp_path),
+            report_date,
+            [LicenseRecord(HEADER, row + [f"{report_date:%B %d, %Y}"]) for row in rows],
+        )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ReportRequestHandler)
+    server.store_dir = str(tmp_path)
+    Thread(target=server.serve_forever, daemon=True).start()
+
+    def get(path, headers=None):
+        conn = HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+        conn.request("GET", path, headers=headers or {})
+        response = conn.getresponse()
+        body = response.read().decode("utf-8")
+        conn.close()
+        return response, body
+
+    yield get
+    server.shutdown()
+    server.server_close()
+
+
+def test_dates_lists_the_stored_days(api):
+    response, body = api("/dates")
+    assert response.status == 200
+    assert json.loads(body) == ["2024-03-04", "2024-03-05"]
+
+
+def test_csv_report_is_streamed_and_filtered(api):
+    response, body = api("/reports?start=2024-03-04&end=2024-03-05&status=active")
+    assert response.status == 200
+    assert response.getheader("Transfer-Encoding") == "chunked"
+    lines = body.splitlines()
+    assert lines[0] == "License Number,Status,License Type,Report Date"
+    assert [line.split(",")[0] for line in lines[1:]] == ["100", "102"]
+
+
+def test_json_report_filters_on_several_columns(api):
+    response, body = api("/reports?format=json&status=ACTIVE&license_type=20")
+    assert response.status == 200
+    records = json.loads(body)
+    assert [record["License Number"] for record in records] == ["102"]
+
+
+def test_matching_etag_returns_not_modified(api):
+    response, _ = api("/reports?start=2024-03-04&end=2024-03-04")
+    etag = response.getheader("ETag")
+    assert etag
+
+    response, body = api(
+        "/reports?start=2024-03-04&end=2024-03-04", {"If-None-Match": etag}
+    )
+    assert response.status == 304
+    assert body == ""
+
+    # Another query has another ETag
+    response, _ = api(
+        "/reports?start=2024-03-04&end=2024-03-05", {"If-None-Match": etag}
+    )
+    assert response.status == 200
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/reports?start=03/04/2024",
+        "/reports?format=xml",
+        "/reports?report_type=new",
+    ],
+)
+def test_bad_requests_are_rejected(api, path):
+    response, _ = api(path)
+    assert response.status == 400
+
+
+def test_unknown_endpoint(api):
+    response, _ = api("/nothing")
+    assert response.status == 404
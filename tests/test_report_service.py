@@ -0,0 +1,127 @@
+import asyncio
+import csv
+import os
+from datetime import datetime, timedelta
+from threading import Event
+
+import report_service
+from report_calendar import is_closed_day, no_data_key
+from report_store import iter_stored_records, store_path
+from utils import NEW_APPLICATIONS_REPORT
+
+
+def recent_business_day():
+    report_date = datetime.now() - timedelta(days=1)
+    report_date = datetime(report_date.year, report_date.month, report_date.day)
+    while is_closed_day(report_date):
+        report_date -= timedelta(days=1)
+    return report_date
+
+
+def fake_site(pages):
+    """
+    Returns a fetch_report_files stand-in serving rows per (report_type, report_date).
+    """
+
+    async def fetch_report_files(
+        page, report_jobs, pageurl, source_file, output, no_data_dates, *args
+    ):
+        for report_type, report_date in report_jobs:
+            rows = pages.get((report_type, report_date))
+            if not rows:
+                no_data_dates.add(no_data_key(report_type, report_date))
+                continue
+            with open(source_file, "w", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows([["License Number", "Status"]] + rows)
+            no_data_dates.discard(no_data_key(report_type, report_date))
+            yield report_type, report_date, source_file
+
+    return fetch_report_files
+
+
+def refresh(monkeypatch, store_dir, pages, refetch_days):
+    monkeypatch.setattr(report_service, "fetch_report_files", fake_site(pages))
+    return asyncio.run(
+        report_service.refresh_store(
+            None,
+            str(store_dir),
+            "",
+            os.path.join(store_dir, "download.csv"),
+            lookback_days=14,
+            refetch_days=refetch_days,
+        )
+    )
+
+
+def test_refetch_window_ignores_no_data_calendar(monkeypatch, tmp_path):
+    job = (NEW_APPLICATIONS_REPORT, recent_business_day())
+    # The site had not published the day yet
+    refresh(monkeypatch, tmp_path, {}, refetch_days=14)
+    assert not os.path.exists(store_path(tmp_path, job[1]))
+
+    refresh(monkeypatch, tmp_path, {job: [["100", "ACTIVE"]]}, refetch_days=14)
+    assert [r.values[0] for r in iter_stored_records(tmp_path, job[1], job[1])] == [
+        "100"
+    ]
+
+
+def test_empty_refetch_removes_stored_rows(monkeypatch, tmp_path):
+    job = (NEW_APPLICATIONS_REPORT, recent_business_day())
+    refresh(monkeypatch, tmp_path, {job: [["100", "ACTIVE"]]}, refetch_days=14)
+
+    assert refresh(monkeypatch, tmp_path, {}, refetch_days=14) == 1
+    assert list(iter_stored_records(tmp_path, job[1], job[1])) == []
+    deltas_dir = os.path.join(tmp_path, str(NEW_APPLICATIONS_REPORT), "deltas")
+    (delta_file,) = os.listdir(deltas_dir)
+    with open(os.path.join(deltas_dir, delta_file), newline="", encoding="utf-8") as f:
+        delta = list(csv.reader(f))
+    assert delta[1][:2] == ["removed", "100"]
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.listeners = {}
+        self.closed = False
+
+    def on(self, event, listener):
+        self.listeners[event] = listener
+
+    def crash(self):
+        self.listeners["disconnected"]()
+
+    async def newPage(self):
+        return object()
+
+    async def close(self):
+        self.closed = True
+
+
+def test_scheduler_restarts_a_disconnected_browser(monkeypatch, tmp_path):
+    browsers = []
+    stop_event = Event()
+
+    def launch(loop, *args):
+        browsers.append(FakeBrowser())
+        return browsers[-1]
+
+    async def prepare_download_page(*args):
+        pass
+
+    async def refresh_store(page, store_dir, *args):
+        summary = args[-1]
+        if len(browsers) == 1:
+            # Chrome died mid-refresh: every job was missed
+            browsers[0].crash()
+            summary.missed.append((NEW_APPLICATIONS_REPORT, datetime.now(), "error"))
+        else:
+            stop_event.set()
+        return 0
+
+    monkeypatch.setattr(report_service, "pyppeteerBrowserInit", launch)
+    monkeypatch.setattr(report_service, "prepare_download_page", prepare_download_page)
+    monkeypatch.setattr(report_service, "refresh_store", refresh_store)
+    monkeypatch.setattr(report_service, "BROWSER_RESTART_DELAY", 0)
+
+    report_service.run_scheduler(str(tmp_path), 0, 14, stop_event)
+    assert len(browsers) == 2
+    assert browsers[0].closed and browsers[1].closed
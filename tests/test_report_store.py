@@ -0,0 +1,31 @@
+from license_record import LicenseRecord, intern_header
+from report_store import diff_report_day
+
+HEADER = intern_header(["License Number", "License Type", "Status"])
+
+
+def records(*rows):
+    return [LicenseRecord(HEADER, row) for row in rows]
+
+
+def changed(changes):
+    return [(change, record.values) for change, record in changes]
+
+
+def test_diff_matches_duplicate_license_numbers():
+    old = records(("100", "20", "ACTIVE"), ("100", "41", "ACTIVE"))
+    new = old + records(("200", "47", "ACTIVE"))
+
+    assert changed(diff_report_day(old, new)) == [("added", ("200", "47", "ACTIVE"))]
+
+
+def test_diff_pairs_duplicates_in_order():
+    old = records(("100", "20", "ACTIVE"), ("100", "41", "ACTIVE"))
+    new = records(("100", "20", "PENDING"), ("100", "41", "ACTIVE"))
+
+    assert changed(diff_report_day(old, new)) == [
+        ("modified", ("100", "20", "PENDING"))
+    ]
+    assert changed(diff_report_day(old, old[:1])) == [
+        ("removed", ("100", "41", "ACTIVE"))
+    ]
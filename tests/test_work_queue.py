@@ -0,0 +1,229 @@
+import csv
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from threading import Thread
+from urllib.request import urlopen
+
+import work_queue
+from report_calendar import is_closed_day
+from standin_site import generate_report_rows
+from work_queue import (
+    DONE,
+    FAILED,
+    MAX_JOB_LEASES,
+    PENDING,
+    JobQueue,
+    RemoteJobQueue,
+    run_coordinator,
+    serve_queue,
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs 'work_queue.py worker' without a browser: jobs are fetched from the
+# stand-in site's generated rows, and a worker started with HANG set never
+# finishes its first job
+WORKER_SCRIPT = """
+import asyncio
+import os
+import sys
+
+import work_queue
+from standin_site import generate_report_rows
+
+
+class Browser:
+    async def newPage(self):
+        return None
+
+    async def close(self):
+        pass
+
+
+async def prepare_download_page(*args):
+    pass
+
+
+async def fetch_job_result(page, report_type, report_date, *args):
+    if os.environ.get("HANG"):
+        await asyncio.sleep(3600)
+    rows = generate_report_rows(report_type, report_date)
+    if not rows:
+        return work_queue.EMPTY, None, 0
+    lines = ["License Number,Report Date"]
+    lines += [f'{row[0]},"{report_date:%B %d, %Y}"' for row in rows]
+    return work_queue.DONE, "\\n".join(lines) + "\\n", len(rows)
+
+
+work_queue.pyppeteerBrowserInit = lambda *args: Browser()
+work_queue.prepare_download_page = prepare_download_page
+work_queue.fetch_job_result = fetch_job_result
+work_queue.QUEUE_POLL_INTERVAL = 0.2
+sys.argv = ["work_queue.py", "worker", "--coordinator", sys.argv[1]]
+work_queue.main()
+"""
+
+REPORT_TYPE = 1
+RESULT = 'License Number,Report Date\n100,"March 04, 2024"\n'
+
+
+def day(n):
+    return datetime(2024, 3, n)
+
+
+def finish_all(queue, worker="worker-1"):
+    while True:
+        job = queue.lease(worker)
+        if job is None:
+            return
+        report_type, report_date, _ = job
+        queue.complete(worker, report_type, report_date, RESULT, 1)
+
+
+def test_results_are_scoped_to_the_run(tmp_path):
+    queue = JobQueue(str(tmp_path))
+    queue.enqueue([(REPORT_TYPE, day(4)), (REPORT_TYPE, day(5))])
+    finish_all(queue)
+
+    queue.enqueue([(REPORT_TYPE, day(6))])
+    finish_all(queue)
+    assert queue.result_names(day(6), day(6), [REPORT_TYPE]) == ["1:2024-03-06"]
+    assert queue.result_names(day(6), day(6), [2]) == []
+
+
+def test_failed_jobs_are_retried_when_enqueued_again(tmp_path):
+    queue = JobQueue(str(tmp_path))
+    queue.enqueue([(REPORT_TYPE, day(4))])
+    for _ in range(MAX_JOB_LEASES):
+        _, report_date, _ = queue.lease("worker-1")
+        queue.release("worker-1", REPORT_TYPE, report_date, "timed out")
+    assert queue.lease("worker-1") is None
+    assert queue.counts()[FAILED] == 1
+
+    assert queue.enqueue([(REPORT_TYPE, day(4))]) == 1
+    assert queue.counts()[PENDING] == 1
+    assert queue.lease("worker-1") is not None
+
+
+def test_jobs_are_fetched_again_for_a_different_type_column(tmp_path):
+    queue = JobQueue(str(tmp_path))
+    queue.enqueue([(REPORT_TYPE, day(4))], type_column=False)
+    finish_all(queue)
+    assert queue.enqueue([(REPORT_TYPE, day(4))], type_column=False) == 0
+    assert queue.counts()[DONE] == 1
+
+    assert queue.enqueue([(REPORT_TYPE, day(4))], type_column=True) == 1
+    assert queue.lease("worker-1") == (REPORT_TYPE, day(4), True)
+
+
+def test_remote_workers_use_the_coordinator_endpoint(tmp_path):
+    queue = JobQueue(str(tmp_path))
+    queue.enqueue([(REPORT_TYPE, day(3)), (REPORT_TYPE, day(4))])
+    # Only the run's jobs are handed out
+    server = serve_queue(queue, "127.0.0.1", 0, (day(4), day(4), [REPORT_TYPE]))
+    try:
+        remote = RemoteJobQueue(f"http://127.0.0.1:{server.server_port}")
+        assert remote.unfinished()
+        job = remote.lease("worker-1")
+        assert job == (REPORT_TYPE, day(4), False)
+        assert remote.heartbeat("worker-1", REPORT_TYPE, day(4))
+        assert not remote.complete("worker-2", REPORT_TYPE, day(4), RESULT, 1)
+        assert remote.complete("worker-1", REPORT_TYPE, day(4), RESULT, 1)
+        assert remote.lease("worker-1") is None
+        assert not remote.unfinished()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    with queue.open_result("1:2024-03-04") as result:
+        assert result.read() == RESULT
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_worker_process(coordinator_url, log_file, hang=False):
+    env = dict(os.environ, HANG="1") if hang else os.environ
+    return subprocess.Popen(
+        [sys.executable, "-u", "-c", WORKER_SCRIPT, coordinator_url],
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+
+
+def wait_for_output(path, text, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with open(path, encoding="utf-8") as f:
+            if text in f.read():
+                return
+        time.sleep(0.1)
+    raise AssertionError(f"{text!r} not in the output of {path}")
+
+
+def test_killed_worker_job_is_finished_by_the_others(monkeypatch, tmp_path):
+    start_date, end_date = day(4), day(15)
+    expected_rows = sum(
+        len(generate_report_rows(REPORT_TYPE, start_date + timedelta(days=n)))
+        for n in range((end_date - start_date).days + 1)
+        if not is_closed_day(start_date + timedelta(days=n))
+    )
+    monkeypatch.setattr(work_queue, "LEASE_SECONDS", 2)
+    port = free_port()
+    coordinator_url = f"http://127.0.0.1:{port}"
+    outputs = []
+    coordinator = Thread(
+        target=lambda: outputs.extend(
+            run_coordinator(
+                JobQueue(str(tmp_path / "queue")),
+                start_date,
+                end_date,
+                str(tmp_path),
+                "report",
+                [REPORT_TYPE],
+                poll_interval=0.1,
+                port=port,
+            )
+        )
+    )
+    coordinator.start()
+    for _ in range(100):
+        try:
+            urlopen(f"{coordinator_url}/status", timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+
+    workers = []
+    try:
+        # The first worker leases the first job and is killed while holding it
+        with open(tmp_path / "victim.log", "w") as log_file:
+            workers.append(start_worker_process(coordinator_url, log_file, hang=True))
+        wait_for_output(tmp_path / "victim.log", "leased")
+        for n in range(2):
+            with open(tmp_path / f"worker-{n}.log", "w") as log_file:
+                workers.append(start_worker_process(coordinator_url, log_file))
+        workers[0].kill()
+
+        for worker in workers[1:]:
+            assert worker.wait(timeout=60) == 0
+        coordinator.join(timeout=60)
+        assert not coordinator.is_alive()
+    finally:
+        for worker in workers:
+            if worker.poll() is None:
+                worker.kill()
+
+    (output_file,) = outputs
+    with open(output_file, newline="", encoding="utf-8") as f:
+        assert len(list(csv.reader(f))) - 1 == expected_rows
@@ -1,23 +1,31 @@
 import csv
-import json
+import heapq
 import os
 import platform
 import shutil
+import time
 import tkinter as tk
+from datetime import datetime
+
+# ABC licensing report types, keyed by their RPTTYPE query value
+NEW_APPLICATIONS_REPORT = 2
+REPORT_TYPE_NAMES = {NEW_APPLICATIONS_REPORT: "New Applications"}
 
 
 def print_the_output_statement(output, message):
     """
     Inserts a message into a Tkinter Text widget and prints the message to the console.
     Args:
-        output (tk.Text): The Tkinter Text widget where the message will be inserted.
+        output (tk.Text or None): The Tkinter Text widget where the message will be inserted.
+            When None (e.g. in service mode) the message is only printed.
         message (str): The message to be inserted and printed.
 
     """
-    # Insert the message into the Text widget at the end with the 'bold' tag for styling
-    output.insert(tk.END, f"{message} \n", "bold")
-    # Update the widget to reflect the changes immediately
-    output.update_idletasks()
+    if output is not None:
+        # Insert the message into the Text widget at the end with the 'bold' tag for styling
+        output.insert(tk.END, f"{message} \n", "bold")
+        # Update the widget to reflect the changes immediately
+        output.update_idletasks()
 
     # Print the message to the console
     print(message)
@@ -71,7 +79,16 @@ def find_chrome_executable():
     return None
 
 
-async def page_load(page, date, pageurl):
+def report_type_name(report_type):
+    """
+    Returns the display name of a report type, e.g. 2 -> 'New Applications'.
+    """
+    return REPORT_TYPE_NAMES.get(report_type, f"Report Type {report_type}")
+
+
+async def page_load(
+    page, date, pageurl, report_type=NEW_APPLICATIONS_REPORT, timeout=None
+):
     """
     Loads a web page asynchronously using Puppeteer and checks the response status.
 
@@ -79,14 +96,21 @@ async def page_load(page, date, pageurl):
     - page: Puppeteer page object.
     - date (str): Date parameter to include in the URL query.
     - pageurl (str): Base URL for the web page.
+    - report_type (int): RPTTYPE parameter selecting the licensing report.
+    - timeout (float, optional): Navigation timeout in seconds; library default if None.
 
     Returns:
     - bool: True if page loaded successfully, False otherwise.
     """
-    pageurl = f"{pageurl}/?RPTTYPE=2&RPTDATE={date}"
+    pageurl = f"{pageurl}/?RPTTYPE={report_type}&RPTDATE={date}"
     print(f"Opening page from URL: {pageurl}")
     # Navigate to the page and wait for DOM content to be loaded
-    response = await page.goto(pageurl, waitUntil="domcontentloaded")
+    load_start = time.time()
+    goto_options = {"waitUntil": "domcontentloaded"}
+    if timeout is not None:
+        goto_options["timeout"] = timeout * 1000
+    response = await page.goto(pageurl, goto_options)
+    print(f"Page load took {time.time() - load_start:.2f} seconds")
 
     # Check response status
     if response.status == 404:
@@ -141,283 +165,113 @@ def delete_file(file_path):
         print(f"Error deleting file: {e}")
 
 
-def csv_to_json(csv_file, currendate, json_file):
-    """
-    Convert CSV data to JSON format.
-
-    Parameters:
-    - csv_file (str): Path to the CSV file.
-
-    Returns:
-    - str: JSON formatted string.
-    """
-    json_data = []
-    with open(csv_file, "r") as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            row["Report Date"] = currendate.strftime("%B %d, %Y")
-            json_data.append(row)
-    with open(json_file, "w") as f:
-        json.dump(json_data, f, indent=4)
-
-    return json.dumps(json_data, indent=4)
-
-
-def generate_json_data(main_json):
+def iter_aligned_csv_rows(file_paths, opener=open, interleave_by_date=False):
     """
-    Generate structured JSON data from a main JSON dataset.
+    Reads several CSV files as one table whose columns are the union of theirs.
 
     Parameters:
-    - main_json (str): JSON formatted string representing the main dataset.
-
-    Returns:
-    - str: JSON formatted string representing the parsed and structured data.
-
-    Notes:
-    - Parses the main JSON data to extract and structure information such as DBA, Applicant, Street,
-      City, State, and ZipCode.
-    - Assumes the input JSON data contains entries with a field 'Primary Owner and Premises Addr.'.
-    """
-    data1 = json.loads(main_json)
-    parsed_data = []
-
-    for entry in data1:
-        address = entry.get(
-            "Primary Owner and Premises Addr.", ""
-        )  # Safely retrieve address, default to empty string
-        lines = address.splitlines()
-
-        dba = lines[0].strip()  # Assuming the first line is DBA
-        dba = " ".join(dba.split())
-
-        # Assuming the first line contains both the DBA and the Applicant
-        if "                            " in lines[0]:
-            dba_applicant_parts = lines[0].split("                            ")
-            dba = dba_applicant_parts[0].strip()
-            applicant = dba_applicant_parts[-1].strip()
-        else:
-            applicant = ""
-
-        street = (
-            lines[1].strip() if len(lines) > 1 else ""
-        )  # Assuming the second line is Street
-
-        city_state_zip = (
-            lines[2].strip() if len(lines) > 2 else ""
-        )  # Assuming the third line is City, State ZipCode
-
-        # Split City, State, ZipCode
-        city_state_zip_parts = city_state_zip.split(", ") if city_state_zip else []
-
-        city = city_state_zip_parts[0].strip() if len(city_state_zip_parts) > 0 else ""
-        state_zip = (
-            city_state_zip_parts[1].strip() if len(city_state_zip_parts) > 1 else ""
-        )
-
-        # Separate State and ZipCode
-        state = state_zip.split()[0].strip() if state_zip else ""
-        zipcode = state_zip.split()[1].strip() if len(state_zip.split()) > 1 else ""
-
-        # Print or use the parsed data as needed
-        parsed_entry = {
-            "DBA": dba,
-            "Applicant": applicant,
-            "Street": street,
-            "City": city,
-            "State": state,
-            "ZipCode": zipcode,
-        }
-        parsed_data.append(parsed_entry)
-
-    json_data2 = json.dumps(parsed_data, indent=4)
-    return json_data2
-
-
-def merge_json(json_data1, json_data2):
-    """
-    Merge two JSON data sets into a single JSON array.
-
-    Args:
-        json_data1 (str): JSON formatted string representing the first dataset.
-        json_data2 (str): JSON formatted string representing the second dataset.
+    - file_paths (list): CSV files to read, in order.
+    - opener (callable): Opens the input files, like open().
+    - interleave_by_date (bool): Merge the rows of the files by their 'Report
+      Date' ('Month DD, YYYY') instead of reading the files one after another;
+      every file must already be in date order.
 
     Returns:
-        str: JSON formatted string representing the merged data array.
+    - tuple: (header, rows) where header is the list of all columns, in the
+      order they first appear, and rows is an iterator of rows aligned to it,
+      blank where a file does not have a column.
 
     Raises:
-        ValueError: If the lengths of json_data1 and json_data2 are different.
-
-    Notes:
-        - The function assumes that both input JSON strings represent arrays of objects.
-        - Each object in json_data1 will have additional fields appended from the corresponding object in json_data2.
-        - If json_data1 and json_data2 do not have the same length, a ValueError is raised.
-        - The "Primary Owner and Premises Addr." field is excluded from the merged entries.
+    - FileNotFoundError: If one of the input files is not found.
     """
-    # Parse JSON data
-    data1 = json.loads(json_data1)
-    data2 = json.loads(json_data2)
-
-    if len(data1) != len(data2):
-        raise ValueError("Lengths of json_data1 and json_data2 must be the same.")
-
-    merged_data = []
-    for i in range(len(data1)):
-        merged_entry = {}
-
-        # Copy all fields from data1[i] except "Primary Owner and Premises Addr."
-        for key, value in data1[i].items():
-            if key != "Primary Owner and Premises Addr.":
-                merged_entry[key] = value
-
-        # Append all fields from data2[i]
-        for key, value in data2[i].items():
-            merged_entry[key] = value
-
-        merged_data.append(merged_entry)
-
-    merged_json = json.dumps(merged_data, indent=4)
-    return merged_json
-
-
-def convert_csv_to_json_and_add_report_date(
-    meincsvfile, filename, tempfolder, currendate
+    file_headers = []
+    header = []
+    seen = set()
+    for file_path in file_paths:
+        with opener(file_path, "r", newline="", encoding="utf-8-sig") as infile:
+            headers = next(csv.reader(infile), None)
+        if not headers:
+            continue
+        file_headers.append((file_path, headers))
+        for column in headers:
+            if column not in seen:
+                seen.add(column)
+                header.append(column)
+
+    def aligned_rows(file_path, headers):
+        positions = {column: index for index, column in enumerate(headers)}
+        indexes = [positions.get(column) for column in header]
+        with opener(file_path, "r", newline="", encoding="utf-8-sig") as infile:
+            reader = csv.reader(infile)
+            next(reader, None)
+            for row in reader:
+                if not row:
+                    continue
+                if headers == header:
+                    yield row
+                else:
+                    yield [
+                        row[index] if index is not None and index < len(row) else ""
+                        for index in indexes
+                    ]
+
+    streams = [aligned_rows(file_path, headers) for file_path, headers in file_headers]
+    if interleave_by_date and len(streams) > 1 and "Report Date" in header:
+        date_index = header.index("Report Date")
+        parsed_dates = {}
+
+        def date_key(row):
+            report_date = row[date_index]
+            if report_date not in parsed_dates:
+                parsed_dates[report_date] = datetime.strptime(report_date, "%B %d, %Y")
+            return parsed_dates[report_date]
+
+        return header, heapq.merge(*streams, key=date_key)
+    return header, (row for stream in streams for row in stream)
+
+
+def merge_csv_files(
+    file_paths,
+    save_folder,
+    file_name,
+    file_type,
+    main_folder,
+    opener=open,
+    interleave_by_date=False,
 ):
     """
-    Convert a CSV file to JSON format, add a 'Report Date' field, and save both CSV and JSON files.
-
-    Parameters:
-    - meincsvfile (str): Path to the input CSV file.
-    - filename (str): Base name for the output CSV and JSON files.
-    - tempfolder (str): Path to the temporary folder where files will be saved.
-    - current_date (datetime.datetime): Current date used for adding 'Report Date'.
-
-    Returns:
-    - tuple: A tuple containing:
-        - bool: True if conversion and saving were successful, False otherwise.
-        - str: Path to the directory where the generated files are saved.
-
-    Notes:
-    - The function creates a new CSV file with added 'Report Date' column.
-    - The function also generates a corresponding JSON file with the converted data.
-    """
-    try:
-        if not os.path.exists(meincsvfile):
-            print(f"Error: File '{meincsvfile}' not found.")
-            return False
-        print("meincsvfile", meincsvfile)
-        download_date = currendate.strftime("%d_%m_%Y")
-        new_filename = f"{tempfolder}/{filename}_generate_report_{download_date}.csv"
-        print("new_filename", new_filename)
-        tempjson = f"{tempfolder}/{filename}_generate_report_{download_date}.json"
-        print("tempjson", tempjson)
-        current_directory = os.getcwd()
-        print("current_directory", current_directory)
-        # Determine the destination path
-        destination_file = os.path.join(current_directory, new_filename)
-        print("destination_file", destination_file)
-        report_directory = os.path.dirname(destination_file)
-        print("report_directory", report_directory)
-        if not os.path.exists(report_directory):
-            os.makedirs(report_directory)
-            print(f"Created directory: {report_directory}")
-        json_data = csv_to_json(meincsvfile, currendate, tempjson)
-        json_data2 = generate_json_data(json_data)
-        mergejson = merge_json(json_data, json_data2)
-        with open(tempjson, "r") as f:
-            data = json.load(f)
-        if data:
-            # Extract headers from the first dictionary
-            headers = data[0].keys()
-            # Write CSV file
-            with open(new_filename, "w", newline="") as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=headers)
-                writer.writeheader()
-                writer.writerows(data)
-        delete_file(tempjson) if os.path.exists(tempjson) else ""
-        return True, report_directory
-    except PermissionError:
-        print(f"Error: Permission denied moving '{meincsvfile}'.")
-
-
-def list_files_in_directory(directory_path):
-    """
-    List all files in a directory.
-
-    Parameters:
-    - directory_path (str): Path to the directory.
-
-    Returns:
-    - list: List of file paths in the directory.
-
-    Notes:
-    - If the directory is not found, an empty list is returned.
-    - If permission is denied to access the directory, an empty list is returned.
-    """
-    file_paths = []
-    try:
-        # List all files in the directory
-        files = os.listdir(directory_path)
-        # Collect each file path in the directory
-        for file in files:
-            file_path = os.path.join(directory_path, file)
-            if os.path.isfile(file_path):
-                file_paths.append(file_path)
-        return file_paths
-    except FileNotFoundError:
-        print(f"Directory '{directory_path}' not found.")
-        return []
-    except PermissionError:
-        print(f"Permission denied accessing '{directory_path}'.")
-        return []
-
-
-def merge_csv_files(file_paths, save_folder, file_name, file_type, main_folder):
-    """
-    merge multiple CSV files into one CSV file, sorted by 'Report Date' in ascending order.
+    merge multiple CSV files into one CSV file, streaming rows in the order of file_paths.
 
     Parameters:
-    - file_paths (list): List of paths to CSV files to merge.
+    - file_paths (list): List of paths to CSV files to merge, already in 'Report Date' order.
     - save_folder (str): Folder path where the merged CSV file will be saved.
     - file_name (str): Name of the merged CSV file.
     - file_type (str): File extension ('csv', 'xlsx', etc.).
-    - main_folder (str): Main folder where intermediate files might be stored.
+    - main_folder (str or None): Main folder where intermediate files are stored;
+      deleted after merging unless None.
+    - opener (callable): Opens the input files; the open method of a staging
+      backend to read them from staging.
+    - interleave_by_date (bool): Merge rows of the files in 'Report Date' order
+      instead of appending the files one after another.
     returns:
     - str: Path to the merged CSV file.
     raises:
     - FileNotFoundError: If one of the input CSV files is not found.
     - PermissionError: If permission is denied accessing or writing to output files.
+
+    Notes:
+    - Rows are copied one at a time, so memory use does not grow with the number of rows.
+    - Files with different columns are aligned on the union of their columns.
     """
     os.makedirs(save_folder, exist_ok=True)
     output_file = os.path.join(save_folder, f"{file_name}.{file_type}")
-    combined_data = []
-    header_written = False
     try:
-        for file_path in file_paths:
-            if not os.path.isfile(file_path):
-                raise FileNotFoundError(f"File not found: '{file_path}'")
-
-            with open(file_path, "r", newline="", encoding="utf-8-sig") as infile:
-                reader = csv.reader(infile)
-                headers = next(reader)  # Read headers from the first file
-                if not header_written:
-                    combined_data.append(headers)  # Append headers only once
-                    header_written = True
-                for row in reader:
-                    combined_data.append(row)  # Append rows from each file
-
-        # Find the index of 'Report Date' column
-        report_date_index = headers.index("Report Date")
-
-        # Sort combined_data by 'Report Date' column (skip sorting headers)
-        combined_data.sort(
-            key=lambda x: (
-                x[report_date_index] if x[report_date_index].isdigit() else float("inf")
-            )
-        )
-
+        headers, rows = iter_aligned_csv_rows(file_paths, opener, interleave_by_date)
         with open(output_file, "w", newline="", encoding="utf-8") as outfile:
             writer = csv.writer(outfile)
-            writer.writerows(combined_data)
+            if headers:
+                writer.writerow(headers)  # Write headers only once
+            writer.writerows(rows)  # Stream rows from each file
 
         print(f"Merged {len(file_paths)} CSV files into '{output_file}'")
     except FileNotFoundError as e:
@@ -427,8 +281,9 @@ def merge_csv_files(file_paths, save_folder, file_name, file_type, main_folder):
         print(f"Error: Permission denied accessing or writing to output files.")
         print(e)
 
-    # Assuming delete_directory is a function that deletes the main_folder
-    delete_directory(rf"{main_folder}")
+    # Delete the folder of intermediate files, unless the caller keeps it
+    if main_folder:
+        delete_directory(rf"{main_folder}")
     return output_file
 
 
@@ -458,24 +313,21 @@ def delete_directory(directory_path):
         )  # Print error message if deletion fails
 
 
-def Read_Csv(file_path):
+def count_csv_rows(file_path):
     """
-    Read data from a CSV file and return it as a list of lists.
+    Count the data rows of a CSV file.
 
     Parameters:
     - file_path (str): Path to the CSV file to be read.
 
     Returns:
-    - list: A list containing each row of the CSV file as a list of strings.
-            Each inner list represents a row of data from the CSV file.
+    - int: Number of non-empty rows after the header row.
 
     Raises:
     - FileNotFoundError: If the specified file_path does not exist.
     - IOError: If an error occurs while reading the file.
     """
-    csv_data = []
-    with open(file_path, "r", newline="") as csvfile:
-        csvreader = csv.reader(csvfile, delimiter=";")
-        for row in csvreader:
-            csv_data.append(row)
-    return csv_data
+    with open(file_path, "r", newline="", encoding="utf-8-sig") as csvfile:
+        csvreader = csv.reader(csvfile)
+        next(csvreader, None)
+        return sum(1 for row in csvreader if row)
@@ -1,10 +1,196 @@
 import asyncio
-from pyppeteer import launch
+import json
+import os
+import socket
+from urllib.request import Request, urlopen
+
+from pyppeteer import connect, launch
+from pyppeteer.browser import BrowserContext
 
 from utils import find_chrome_executable
 
+# Persistent Browser Settings
+BROWSER_DATA_DIR = os.path.join(os.path.expanduser("~"), ".abc_license_report")
+BROWSER_PROFILE_DIR = os.path.join(BROWSER_DATA_DIR, "profile")  # Warm Chrome profile
+BROWSER_CACHE_DIR = os.path.join(BROWSER_DATA_DIR, "cache")  # Disk cache of site assets
+BROWSER_CACHE_MAX_BYTES = 200 * 1024 * 1024  # Size limit of the disk cache
+# Lock files Chrome keeps in a profile while it is in use (Linux/macOS), which a
+# crashed or killed Chrome leaves behind
+PROFILE_SINGLETON_FILES = ("SingletonLock", "SingletonSocket", "SingletonCookie")
+
 
-def pyppeteerBrowserInit(loop, headless, width, height):
+def browser_launch_args(
+    width, height, user_data_dir="/tmp/pyppeteer", cache_dir=None, cache_max_bytes=None
+):
+    """
+    Builds the Chrome command line arguments used for every launched browser.
+
+    Args:
+        width (int): The width of the browser window.
+        height (int): The height of the browser window.
+        user_data_dir (str or None): The Chrome profile directory. If None, pyppeteer
+            creates a temporary profile and deletes it when the browser closes.
+        cache_dir (str, optional): The Chrome disk cache directory.
+        cache_max_bytes (int, optional): Size limit Chrome applies to the disk cache.
+
+    Returns:
+        list: Chrome command line arguments.
+    """
+    args = [
+        "--no-sandbox",
+        "--disable-setuid-sandbox",
+        "--disable-infobars",
+        "--disable-dev-shm-usage",
+        "--disable-accelerated-2d-canvas",
+        "--disable-gpu",
+        f"--window-size={width},{height}",
+        "--start-maximized",
+        "--disable-notifications",
+        "--disable-popup-blocking",
+        "--ignore-certificate-errors",
+        "--allow-file-access",
+        "--allow-running-insecure-content",
+        "--disable-web-security",
+        "--disable-background-timer-throttling",
+        "--disable-backgrounding-occluded-windows",
+        "--disable-renderer-backgrounding",
+        "--disable-background-networking",
+    ]
+    if user_data_dir:
+        args.append(f"--user-data-dir={user_data_dir}")
+    if cache_dir:
+        args.append(f"--disk-cache-dir={cache_dir}")
+    if cache_max_bytes:
+        args.append(f"--disk-cache-size={cache_max_bytes}")
+    return args
+
+
+def prune_browser_cache(cache_dir, max_bytes):
+    """
+    Deletes the least recently used cache files until the cache fits in max_bytes.
+
+    Args:
+        cache_dir (str): The Chrome disk cache directory.
+        max_bytes (int): Size limit of the cache.
+
+    Returns:
+        int: Number of bytes freed.
+
+    Notes:
+        The cache is pruned down to 80% of the limit so that it is not pruned
+        again on every launch. Must only run while no browser uses the cache.
+    """
+    entries = []
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return 0
+
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total - freed <= max_bytes * 0.8:
+            break
+        try:
+            os.remove(path)
+            freed += size
+        except OSError as e:
+            print(f"Error pruning browser cache file {path}: {e}")
+    print(f"Pruned {freed / (1024 * 1024):.1f} MiB from browser cache {cache_dir}")
+    return freed
+
+
+def _process_alive(pid):
+    """
+    Returns True if a process with this id exists (POSIX only).
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def profile_in_use(profile_dir):
+    """
+    Checks whether a running Chrome holds a profile, removing locks of a Chrome that died.
+
+    Args:
+        profile_dir (str): The Chrome profile directory.
+
+    Returns:
+        bool: True if another browser is using the profile.
+
+    Notes:
+        On Linux/macOS SingletonLock is a symlink to '<hostname>-<pid>'; the lock
+        is stale if that process no longer runs on this host. On Windows Chrome
+        keeps 'lockfile' open, so it can only be deleted once Chrome is gone.
+    """
+    singleton_lock = os.path.join(profile_dir, "SingletonLock")
+    if os.path.lexists(singleton_lock):
+        try:
+            host, _, pid = os.readlink(singleton_lock).rpartition("-")
+        except OSError:
+            return True
+        if (
+            host != socket.gethostname()
+            or not pid.isdigit()
+            or _process_alive(int(pid))
+        ):
+            return True
+        print(f"Removing stale lock of browser profile {profile_dir} (pid {pid})")
+        for name in PROFILE_SINGLETON_FILES:
+            path = os.path.join(profile_dir, name)
+            if os.path.lexists(path):
+                os.remove(path)
+
+    lockfile = os.path.join(profile_dir, "lockfile")
+    if os.path.lexists(lockfile):
+        try:
+            os.remove(lockfile)
+        except OSError:
+            return True
+    return False
+
+
+def prepare_browser_profile(
+    profile_dir=BROWSER_PROFILE_DIR,
+    cache_dir=BROWSER_CACHE_DIR,
+    cache_max_bytes=BROWSER_CACHE_MAX_BYTES,
+):
+    """
+    Prepares the persistent browser profile and disk cache for a launch.
+
+    Args:
+        profile_dir (str): The persistent Chrome profile directory.
+        cache_dir (str): The persistent Chrome disk cache directory.
+        cache_max_bytes (int): Size limit of the disk cache.
+
+    Returns:
+        tuple: (user_data_dir, cache_dir) to launch with. If another browser is
+            already using the persistent profile, (None, None) is returned so the
+            browser gets a temporary profile that is deleted when it closes.
+    """
+    if profile_in_use(profile_dir):
+        print(f"Browser profile {profile_dir} is in use, using a temporary profile")
+        return None, None
+
+    os.makedirs(profile_dir, exist_ok=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    prune_browser_cache(cache_dir, cache_max_bytes)
+    return profile_dir, cache_dir
+
+
+def pyppeteerBrowserInit(loop, headless, width, height, user_data_dir=None):
     """
     initializes a Pyppeteer browser instance with the specified parameters.
 
@@ -13,6 +199,9 @@ def pyppeteerBrowserInit(loop, headless, width, height):
         headless (bool): Whether to run the browser in headless mode.
         width (int): The width of the browser window.
         height (int): The height of the browser window.
+        user_data_dir (str, optional): The Chrome profile directory. Defaults to the
+            persistent profile and disk cache from prepare_browser_profile, so site
+            assets stay cached between runs.
 
     Returns:
         browser (pyppeteer.browser.Browser or None): The initialized browser instance, or None if an error occurred.
@@ -22,6 +211,13 @@ def pyppeteerBrowserInit(loop, headless, width, height):
     print("executable_path", executable_path)
     print(f"Using random window size: {width}x{height}")
 
+    # Use the warm persistent profile unless a specific one was requested; None
+    # after prepare_browser_profile means a temporary profile
+    cache_dir = None
+    if user_data_dir is None:
+        user_data_dir, cache_dir = prepare_browser_profile()
+    print("user_data_dir", user_data_dir)
+
     # Set the provided event loop as the current event loop
     asyncio.set_event_loop(loop)
 
@@ -31,27 +227,9 @@ def pyppeteerBrowserInit(loop, headless, width, height):
             launch(
                 executablePath=executable_path,
                 headless=headless,
-                args=[
-                    "--no-sandbox",
-                    "--disable-setuid-sandbox",
-                    "--disable-infobars",
-                    "--disable-dev-shm-usage",
-                    "--disable-accelerated-2d-canvas",
-                    "--disable-gpu",
-                    f"--window-size={width},{height}",
-                    "--start-maximized",
-                    "--disable-notifications",
-                    "--disable-popup-blocking",
-                    "--ignore-certificate-errors",
-                    "--allow-file-access",
-                    "--allow-running-insecure-content",
-                    "--disable-web-security",
-                    "--user-data-dir=/tmp/pyppeteer",
-                    "--disable-background-timer-throttling",
-                    "--disable-backgrounding-occluded-windows",
-                    "--disable-renderer-backgrounding",
-                    "--disable-background-networking",
-                ],
+                args=browser_launch_args(
+                    width, height, user_data_dir, cache_dir, BROWSER_CACHE_MAX_BYTES
+                ),
             )
         )
         return browser
@@ -60,3 +238,124 @@ def pyppeteerBrowserInit(loop, headless, width, height):
         # Print the error and return None if an exception occurs
         print(f"Error initializing browser: {e}")
         return None
+
+
+def resolve_browser_endpoint(browser_endpoint):
+    """
+    Resolves a browser endpoint setting to a DevTools websocket URL.
+
+    Args:
+        browser_endpoint (str): Either a 'ws://' DevTools websocket URL, or the
+            'http://host:port' address of a browser broker.
+
+    Returns:
+        str: The DevTools websocket URL of the browser.
+    """
+    if browser_endpoint.startswith(("ws://", "wss://")):
+        return browser_endpoint
+    with urlopen(
+        f"{browser_endpoint.rstrip('/')}/json/version", timeout=10
+    ) as response:
+        return json.load(response)["webSocketDebuggerUrl"]
+
+
+def pyppeteerBrowserConnect(loop, browser_endpoint):
+    """
+    Connects to an already running browser instead of launching a new one.
+
+    Args:
+        loop (asyncio.AbstractEventLoop): The event loop to use for asynchronous operations.
+        browser_endpoint (str): DevTools websocket URL, or HTTP address of a browser broker.
+
+    Returns:
+        browser (pyppeteer.browser.Browser or None): The connected browser, or None if an error occurred.
+
+    Notes:
+        Callers should open their pages in a context from open_browser_context so
+        that jobs sharing the browser do not share cookies or storage, and call
+        browser.disconnect() rather than browser.close() when done.
+    """
+    asyncio.set_event_loop(loop)
+
+    try:
+        ws_endpoint = resolve_browser_endpoint(browser_endpoint)
+        print("browser_ws_endpoint", ws_endpoint)
+        return loop.run_until_complete(connect(browserWSEndpoint=ws_endpoint))
+
+    except Exception as e:
+        # Print the error and return None if an exception occurs
+        print(f"Error connecting to browser: {e}")
+        return None
+
+
+def _broker_request(broker_url, path, method):
+    """
+    Sends a request to a browser broker and returns the decoded JSON response.
+    """
+    request = Request(f"{broker_url.rstrip('/')}{path}", method=method)
+    with urlopen(request, timeout=10) as response:
+        return json.load(response)
+
+
+async def open_browser_context(browser, browser_endpoint):
+    """
+    Opens an isolated incognito context on a shared browser.
+
+    Args:
+        browser (pyppeteer.browser.Browser): Browser from pyppeteerBrowserConnect.
+        browser_endpoint (str): The endpoint the browser was connected through. For a
+            broker ('http://...') the context is leased from the broker, otherwise it
+            is created directly.
+
+    Returns:
+        context (pyppeteer.browser.BrowserContext): The isolated context.
+    """
+    if browser_endpoint.startswith(("ws://", "wss://")):
+        return await browser.createIncognitoBrowserContext()
+
+    loop = asyncio.get_event_loop()
+    lease = await loop.run_in_executor(
+        None, _broker_request, browser_endpoint, "/contexts", "POST"
+    )
+    # The context was created by the broker, so register it with this connection
+    context = BrowserContext(browser, lease["contextId"])
+    browser._contexts[lease["contextId"]] = context
+    # Renew the lease while the context is in use, so the broker keeps it open
+    context._lease_renewal = asyncio.ensure_future(
+        _renew_broker_lease(browser_endpoint, lease["contextId"], lease["leaseSeconds"])
+    )
+    return context
+
+
+async def _renew_broker_lease(broker_url, context_id, lease_seconds):
+    """
+    Renews a context lease at a third of its duration until cancelled.
+    """
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(lease_seconds / 3)
+        try:
+            await loop.run_in_executor(
+                None, _broker_request, broker_url, f"/contexts/{context_id}", "PUT"
+            )
+        except OSError as e:
+            print(f"Could not renew browser context lease {context_id}: {e}")
+
+
+async def close_browser_context(context, browser_endpoint):
+    """
+    Closes a context opened with open_browser_context, returning it to the broker if leased.
+
+    Args:
+        context (pyppeteer.browser.BrowserContext): The context to close.
+        browser_endpoint (str): The endpoint the browser was connected through.
+    """
+    if browser_endpoint.startswith(("ws://", "wss://")):
+        await context.close()
+        return
+
+    context._lease_renewal.cancel()
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(
+        None, _broker_request, browser_endpoint, f"/contexts/{context._id}", "DELETE"
+    )
@@ -0,0 +1,950 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import time
+import uuid
+from contextlib import closing
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.request import Request, urlopen
+
+from page_timings import PageTimings
+from partitioned_output import (
+    DAY_PARTITIONS,
+    GZIP_COMPRESSION,
+    MONTH_PARTITIONS,
+    SINGLE_FILE_LAYOUT,
+    ZSTD_COMPRESSION,
+    write_partitioned_report,
+)
+from pipeline import (
+    FetchBudget,
+    RunSummary,
+    append_rows_to_csv,
+    fetch_report_files,
+    iter_report_jobs,
+    normalize_rows,
+    parse_report_rows,
+    prepare_download_page,
+)
+from report_calendar import (
+    load_no_data_calendar,
+    no_data_key,
+    save_no_data_calendar,
+    schedule_report_jobs,
+)
+from staging import MemoryStaging
+from utils import NEW_APPLICATIONS_REPORT, merge_csv_files, report_type_name
+from webdriver import (
+    close_browser_context,
+    open_browser_context,
+    pyppeteerBrowserConnect,
+    pyppeteerBrowserInit,
+)
+
+
+# Queue Settings
+QUEUE_DB_NAME = "queue.sqlite3"  # Job table inside the queue folder
+NO_DATA_CALENDAR_NAME = "no_data_calendar.json"  # Calendar file inside the queue folder
+LEASE_SECONDS = 180  # Seconds a job stays leased without a heartbeat
+HEARTBEAT_INTERVAL = 30  # Seconds between lease renewals of a running job
+MAX_JOB_LEASES = 3  # Leases a job gets before it is marked failed
+QUEUE_POLL_INTERVAL = 5  # Seconds between checks of the queue for new or expired jobs
+QUEUE_HOST = "127.0.0.1"  # Interface the coordinator serves the queue on; 0.0.0.0 for other machines
+QUEUE_PORT = 8790  # Port the coordinator serves the queue on
+REPORT_TYPES = (NEW_APPLICATIONS_REPORT,)  # RPTTYPE values enqueued by default
+
+# Browser Settings
+HEADLESS = True  # Whether to run the worker browsers in headless mode
+PAGE_URL = "https://www.abc.ca.gov/licensing/licensing-reports/new-applications/"  # URL for licensing reports
+BROWSER_WIDTH = 1920  # Viewport width of a worker browser
+BROWSER_HEIGHT = 1080  # Viewport height of a worker browser
+
+# Job states
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+EMPTY = "empty"
+FAILED = "failed"
+
+# Name of the per-job CSV a worker builds before uploading it
+RESULT_NAME = "result.csv"
+
+
+class JobQueue:
+    """
+    SQLite queue of (report type, date) jobs, owned by the coordinator.
+
+    The coordinator enqueues the jobs of a backfill and merges the results;
+    workers lease one job at a time, renew the lease while they work and
+    upload the normalized rows of the job as a CSV blob. A lease that is not
+    renewed in time (the worker died or lost its connection) is handed to the
+    next worker that asks.
+
+    The queue uses SQLite's WAL journal, which does not work on network
+    shares: keep the queue folder on a local disk of the coordinator. Workers
+    on other machines reach the queue through the coordinator's HTTP endpoint
+    (QueueRequestHandler and RemoteJobQueue), so only its clock decides when
+    a lease expires.
+    """
+
+    def __init__(self, queue_dir):
+        self.queue_dir = queue_dir
+        self.db_path = os.path.join(queue_dir, QUEUE_DB_NAME)
+        os.makedirs(queue_dir, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    report_type INTEGER NOT NULL,
+                    report_date TEXT NOT NULL,
+                    type_column INTEGER NOT NULL,
+                    state TEXT NOT NULL,
+                    worker TEXT,
+                    lease_expires REAL,
+                    leases INTEGER NOT NULL DEFAULT 0,
+                    row_count INTEGER,
+                    result BLOB,
+                    error TEXT,
+                    PRIMARY KEY (report_type, report_date)
+                )
+                """
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def enqueue(self, report_jobs, type_column=False):
+        """
+        Adds report jobs to the queue.
+
+        Parameters:
+        - report_jobs (iterable): (report_type, report_date) tuples.
+        - type_column (bool): Have workers add a 'Report Type' column to the rows.
+
+        Returns:
+        - int: Number of jobs added or reset.
+
+        Notes:
+        - Jobs already queued keep their state and result, so an interrupted
+          backfill resumes where it stopped. Failed jobs, and jobs queued with
+          a different type_column, are reset to pending and fetched again.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            added = 0
+            for report_type, report_date in report_jobs:
+                key = (report_type, f"{report_date:%Y-%m-%d}")
+                added += conn.execute(
+                    "INSERT OR IGNORE INTO jobs"
+                    " (report_type, report_date, type_column, state) VALUES (?, ?, ?, ?)",
+                    (*key, int(type_column), PENDING),
+                ).rowcount
+                added += conn.execute(
+                    "UPDATE jobs SET state = ?, type_column = ?, worker = NULL,"
+                    " lease_expires = NULL, leases = 0, row_count = NULL,"
+                    " result = NULL, error = NULL"
+                    " WHERE report_type = ? AND report_date = ?"
+                    " AND (state = ? OR type_column != ?)",
+                    (PENDING, int(type_column), *key, FAILED, int(type_column)),
+                ).rowcount
+            conn.execute("COMMIT")
+        return added
+
+    def lease(
+        self,
+        worker,
+        lease_seconds=LEASE_SECONDS,
+        start_date=None,
+        end_date=None,
+        report_types=None,
+    ):
+        """
+        Leases the earliest pending job, or a job whose lease has expired.
+
+        Parameters:
+        - worker (str): Id of the worker taking the job.
+        - lease_seconds (float): Seconds until the lease expires without a heartbeat.
+        - start_date, end_date, report_types (optional): Only lease jobs of
+          this date range and these report types.
+
+        Returns:
+        - tuple or None: (report_type, report_date, type_column), or None if no
+          job is available right now.
+        """
+        condition, values = self._run_filter(start_date, end_date, report_types)
+        with closing(self._connect()) as conn:
+            while True:
+                now = time.time()
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT report_type, report_date, type_column, leases FROM jobs"
+                    " WHERE (state = ? OR (state = ? AND lease_expires < ?))"
+                    f" AND {condition}"
+                    " ORDER BY report_date, report_type LIMIT 1",
+                    (PENDING, LEASED, now, *values),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                report_type, report_date, type_column, leases = row
+                if leases >= MAX_JOB_LEASES:
+                    # Every lease so far ended without a result: give up on the job
+                    conn.execute(
+                        "UPDATE jobs SET state = ?, worker = NULL"
+                        " WHERE report_type = ? AND report_date = ?",
+                        (FAILED, report_type, report_date),
+                    )
+                    conn.execute("COMMIT")
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET state = ?, worker = ?, lease_expires = ?,"
+                    " leases = leases + 1 WHERE report_type = ? AND report_date = ?",
+                    (LEASED, worker, now + lease_seconds, report_type, report_date),
+                )
+                conn.execute("COMMIT")
+                return (
+                    report_type,
+                    datetime.strptime(report_date, "%Y-%m-%d"),
+                    bool(type_column),
+                )
+
+    def _update_leased(self, worker, report_type, report_date, assignments, values):
+        # Only the worker holding the lease may change a leased job
+        with closing(self._connect()) as conn:
+            return (
+                conn.execute(
+                    f"UPDATE jobs SET {assignments}"
+                    " WHERE report_type = ? AND report_date = ?"
+                    " AND state = ? AND worker = ?",
+                    (*values, report_type, f"{report_date:%Y-%m-%d}", LEASED, worker),
+                ).rowcount
+                == 1
+            )
+
+    def heartbeat(self, worker, report_type, report_date, lease_seconds=LEASE_SECONDS):
+        """
+        Renews a lease. Returns False if the worker no longer holds it.
+        """
+        return self._update_leased(
+            worker,
+            report_type,
+            report_date,
+            "lease_expires = ?",
+            (time.time() + lease_seconds,),
+        )
+
+    def complete(self, worker, report_type, report_date, result=None, row_count=0):
+        """
+        Uploads the result of a leased job.
+
+        Parameters:
+        - worker (str): Id of the worker holding the lease.
+        - report_type (int): RPTTYPE of the job.
+        - report_date (datetime.datetime): Report date of the job.
+        - result (str, optional): CSV of the normalized rows; None if the job had no data.
+        - row_count (int): Number of rows in result.
+
+        Returns:
+        - bool: False if the lease expired and the job was reassigned, in which
+          case the result is discarded.
+        """
+        return self._update_leased(
+            worker,
+            report_type,
+            report_date,
+            "state = ?, worker = NULL, row_count = ?, result = ?, error = NULL",
+            (
+                EMPTY if result is None else DONE,
+                row_count,
+                None if result is None else result.encode("utf-8"),
+            ),
+        )
+
+    def release(self, worker, report_type, report_date, error):
+        """
+        Returns a leased job to the queue after a failed attempt.
+        """
+        return self._update_leased(
+            worker,
+            report_type,
+            report_date,
+            "state = ?, worker = NULL, error = ?",
+            (PENDING, error),
+        )
+
+    @staticmethod
+    def _run_filter(start_date, end_date, report_types):
+        # SQL condition and values selecting the jobs of one backfill run
+        conditions, values = [], []
+        if start_date is not None:
+            conditions.append("report_date >= ?")
+            values.append(f"{start_date:%Y-%m-%d}")
+        if end_date is not None:
+            conditions.append("report_date <= ?")
+            values.append(f"{end_date:%Y-%m-%d}")
+        if report_types is not None:
+            report_types = list(report_types)
+            conditions.append(
+                f"report_type IN ({', '.join('?' for _ in report_types)})"
+            )
+            values.extend(report_types)
+        return " AND ".join(conditions) or "1", values
+
+    def counts(self, start_date=None, end_date=None, report_types=None):
+        """
+        Returns the number of jobs in each state, optionally of one date range and
+        set of report types only.
+        """
+        condition, values = self._run_filter(start_date, end_date, report_types)
+        with closing(self._connect()) as conn:
+            counts = dict.fromkeys((PENDING, LEASED, DONE, EMPTY, FAILED), 0)
+            counts.update(
+                conn.execute(
+                    f"SELECT state, COUNT(*) FROM jobs WHERE {condition} GROUP BY state",
+                    values,
+                ).fetchall()
+            )
+            return counts
+
+    def unfinished(self, start_date=None, end_date=None, report_types=None):
+        """
+        Returns True while jobs are pending or leased, optionally of one date
+        range and set of report types only.
+        """
+        counts = self.counts(start_date, end_date, report_types)
+        return counts[PENDING] + counts[LEASED] > 0
+
+    def finished_jobs(self, state, start_date=None, end_date=None, report_types=None):
+        """
+        Returns the (report_type, report_date, error) of every job in a final
+        state, optionally of one date range and set of report types only.
+        """
+        condition, values = self._run_filter(start_date, end_date, report_types)
+        with closing(self._connect()) as conn:
+            return [
+                (report_type, datetime.strptime(report_date, "%Y-%m-%d"), error)
+                for report_type, report_date, error in conn.execute(
+                    "SELECT report_type, report_date, error FROM jobs"
+                    f" WHERE state = ? AND {condition}"
+                    " ORDER BY report_date, report_type",
+                    (state, *values),
+                )
+            ]
+
+    def result_names(self, start_date=None, end_date=None, report_types=None):
+        """
+        Returns the names of the uploaded results in date order, for open_result.
+
+        Parameters:
+        - start_date (datetime.datetime, optional): First report date to include.
+        - end_date (datetime.datetime, optional): Last report date to include.
+        - report_types (iterable, optional): RPTTYPE values to include.
+
+        Returns:
+        - list: Names of the results of the given run; jobs of earlier runs
+          outside its range or report types are left out.
+        """
+        return [
+            f"{job_type}:{job_date:%Y-%m-%d}"
+            for job_type, job_date, _ in self.finished_jobs(
+                DONE, start_date, end_date, report_types
+            )
+        ]
+
+    def open_result(self, name, mode="r", **kwargs):
+        """
+        Opens an uploaded result by name for reading, like open() does a file.
+        """
+        report_type, report_date = name.split(":", 1)
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT result FROM jobs WHERE report_type = ? AND report_date = ?",
+                (int(report_type), report_date),
+            ).fetchone()
+        if row is None or row[0] is None:
+            raise FileNotFoundError(f"No result uploaded for '{name}'")
+        return io.StringIO(row[0].decode("utf-8"), newline="")
+
+    def __repr__(self):
+        return f"JobQueue({self.queue_dir!r})"
+
+
+class QueueRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP interface of the coordinator's queue, used by RemoteJobQueue. Only
+    jobs of the coordinator's run (server.run) are leased.
+
+    Endpoints (JSON bodies with 'worker', 'reportType' and 'reportDate'):
+    - GET /status: whether jobs are still pending or leased.
+    - POST /lease: lease the next job; 'job' is null if none is available.
+    - POST /heartbeat: renew a lease.
+    - POST /complete: upload the 'result' and 'rowCount' of a leased job.
+    - POST /release: return a leased job to the queue with an 'error'.
+    """
+
+    def do_GET(self):
+        if self.path == "/status":
+            self._send_json(
+                200, {"unfinished": self.server.queue.unfinished(*self.server.run)}
+            )
+        else:
+            self._send_json(404, {"error": "Unknown endpoint"})
+
+    def do_POST(self):
+        queue = self.server.queue
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            worker = request["worker"]
+            if self.path == "/lease":
+                job = queue.lease(worker, LEASE_SECONDS, *self.server.run)
+                if job is not None:
+                    job = {
+                        "reportType": job[0],
+                        "reportDate": f"{job[1]:%Y-%m-%d}",
+                        "typeColumn": job[2],
+                    }
+                self._send_json(200, {"job": job})
+                return
+            job = (
+                int(request["reportType"]),
+                datetime.strptime(request["reportDate"], "%Y-%m-%d"),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            self._send_json(400, {"error": f"Bad request: {e}"})
+            return
+
+        if self.path == "/heartbeat":
+            held = queue.heartbeat(worker, *job)
+        elif self.path == "/complete":
+            held = queue.complete(
+                worker, *job, request.get("result"), request.get("rowCount", 0)
+            )
+        elif self.path == "/release":
+            held = queue.release(worker, *job, request.get("error"))
+        else:
+            self._send_json(404, {"error": "Unknown endpoint"})
+            return
+        self._send_json(200, {"held": held})
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Workers poll every few seconds; keep the coordinator's output readable
+        pass
+
+
+def serve_queue(queue, host=QUEUE_HOST, port=QUEUE_PORT, run=(None, None, None)):
+    """
+    Serves a queue to workers over HTTP from a background thread.
+
+    Parameters:
+    - queue (JobQueue): The coordinator's queue.
+    - host (str): Interface to listen on.
+    - port (int): Port to listen on; 0 picks a free one.
+    - run (tuple): (start_date, end_date, report_types) of the jobs to hand out.
+
+    Returns:
+    - ThreadingHTTPServer: The running server; call shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), QueueRequestHandler)
+    server.queue = queue
+    server.run = run
+    Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving the job queue on http://{host}:{server.server_port}")
+    return server
+
+
+class RemoteJobQueue:
+    """
+    Worker side of a JobQueue served by its coordinator with serve_queue.
+
+    Has the worker methods of JobQueue; every call is one HTTP request, so
+    workers need no access to the coordinator's disk.
+    """
+
+    def __init__(self, coordinator_url):
+        self.coordinator_url = coordinator_url.rstrip("/")
+
+    def _request(self, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        request = Request(
+            f"{self.coordinator_url}{path}",
+            data=data,
+            headers={"Content-Type": "application/json"},
+        )
+        with urlopen(request, timeout=60) as response:
+            return json.load(response)
+
+    def _job_request(self, path, worker, report_type, report_date, **fields):
+        return self._request(
+            path,
+            {
+                "worker": worker,
+                "reportType": report_type,
+                "reportDate": f"{report_date:%Y-%m-%d}",
+                **fields,
+            },
+        )["held"]
+
+    def lease(self, worker):
+        job = self._request("/lease", {"worker": worker})["job"]
+        if job is None:
+            return None
+        return (
+            job["reportType"],
+            datetime.strptime(job["reportDate"], "%Y-%m-%d"),
+            job["typeColumn"],
+        )
+
+    def heartbeat(self, worker, report_type, report_date):
+        return self._job_request("/heartbeat", worker, report_type, report_date)
+
+    def complete(self, worker, report_type, report_date, result=None, row_count=0):
+        return self._job_request(
+            "/complete",
+            worker,
+            report_type,
+            report_date,
+            result=result,
+            rowCount=row_count,
+        )
+
+    def release(self, worker, report_type, report_date, error):
+        return self._job_request(
+            "/release", worker, report_type, report_date, error=error
+        )
+
+    def unfinished(self):
+        return self._request("/status")["unfinished"]
+
+    def __repr__(self):
+        return f"RemoteJobQueue({self.coordinator_url!r})"
+
+
+def run_coordinator(
+    queue,
+    start_date,
+    end_date,
+    save_folder,
+    file_name,
+    report_types=REPORT_TYPES,
+    combined_output=True,
+    layout=SINGLE_FILE_LAYOUT,
+    compression=None,
+    poll_interval=QUEUE_POLL_INTERVAL,
+    host=QUEUE_HOST,
+    port=QUEUE_PORT,
+):
+    """
+    Enqueues the jobs of a date range, serves them to the workers and merges their results.
+
+    Parameters:
+    - queue (JobQueue): Queue shared with the workers.
+    - start_date (datetime.datetime): First report date.
+    - end_date (datetime.datetime): Last report date.
+    - save_folder (str): Folder the merged report is written to.
+    - file_name (str): Name of the report file or folder.
+    - report_types (iterable): RPTTYPE values to fetch.
+    - combined_output (bool): With several report types, one report with a
+      'Report Type' column instead of one report per type.
+    - layout (str): SINGLE_FILE_LAYOUT, MONTH_PARTITIONS or DAY_PARTITIONS.
+    - compression (str, optional): Compression of partition files.
+    - poll_interval (float): Seconds between progress checks.
+    - host (str): Interface the queue is served on to the workers.
+    - port (int): Port the queue is served on to the workers.
+
+    Returns:
+    - list: Paths of the merged reports, or of the manifests of partitioned reports.
+
+    Notes:
+    - Only jobs of this date range and these report types are waited for and
+      merged, even if the queue holds jobs of earlier runs.
+    """
+    report_types = list(report_types)
+    per_type = len(report_types) > 1 and not combined_output
+    calendar_file = os.path.join(queue.queue_dir, NO_DATA_CALENDAR_NAME)
+    no_data_dates = load_no_data_calendar(calendar_file)
+    report_jobs, avoided = schedule_report_jobs(
+        iter_report_jobs(start_date, end_date, report_types), no_data_dates
+    )
+    added = queue.enqueue(report_jobs, len(report_types) > 1 and combined_output)
+    print(f"Queued {added} jobs, skipped {avoided} known to have no data")
+    run = (start_date, end_date, report_types)
+
+    server = serve_queue(queue, host, port, run)
+    try:
+        last_counts = None
+        while True:
+            counts = queue.counts(*run)
+            if counts != last_counts:
+                print(", ".join(f"{count} {state}" for state, count in counts.items()))
+                last_counts = counts
+            if counts[PENDING] + counts[LEASED] == 0:
+                break
+            time.sleep(poll_interval)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Remember the empty jobs so later backfills skip them
+    no_data_dates.update(
+        no_data_key(report_type, report_date)
+        for report_type, report_date, _ in queue.finished_jobs(EMPTY, *run)
+    )
+    save_no_data_calendar(calendar_file, no_data_dates)
+    for report_type, report_date, error in queue.finished_jobs(FAILED, *run):
+        print(
+            f"Failed: {report_type_name(report_type)} {report_date:%m/%d/%Y} ({error})"
+        )
+
+    outputs = []
+    if per_type:
+        groups = [
+            ([report_type], f"{file_name}_{report_type_name(report_type)}")
+            for report_type in report_types
+        ]
+    else:
+        groups = [(report_types, file_name)]
+    for group_types, name in groups:
+        result_names = queue.result_names(start_date, end_date, group_types)
+        if not result_names:
+            continue
+        if layout == SINGLE_FILE_LAYOUT:
+            outputs.append(
+                merge_csv_files(
+                    result_names, save_folder, name, "csv", None, queue.open_result
+                )
+            )
+        else:
+            outputs.append(
+                write_partitioned_report(
+                    result_names,
+                    save_folder,
+                    name,
+                    layout,
+                    compression,
+                    queue.open_result,
+                )
+            )
+    return outputs
+
+
+async def fetch_job_result(
+    page, report_type, report_date, type_column, pageurl, source_file, timings
+):
+    """
+    Runs the existing fetch, parse and normalize stages for one leased job.
+
+    Returns:
+    - tuple: (state, result, row_count) where state is DONE with the CSV of the
+      normalized rows as result, EMPTY, or None if the job could not be fetched.
+    """
+    no_data_dates = set()
+    summary = RunSummary()
+    staging = MemoryStaging()
+    row_count = 0
+    async for job_type, job_date, csv_file in fetch_report_files(
+        page,
+        [(report_type, report_date)],
+        pageurl,
+        source_file,
+        None,
+        no_data_dates,
+        FetchBudget(),
+        summary,
+        None,
+        timings,
+    ):
+        rows = normalize_rows(
+            parse_report_rows(csv_file), job_date, job_type if type_column else None
+        )
+        row_count += append_rows_to_csv(rows, RESULT_NAME, opener=staging.open)
+    if staging.exists(RESULT_NAME):
+        with staging.open(RESULT_NAME) as result:
+            return DONE, result.read(), row_count
+    if no_data_dates:
+        return EMPTY, None, 0
+    return None, None, 0
+
+
+async def keep_lease(
+    queue, worker, report_type, report_date, interval=HEARTBEAT_INTERVAL
+):
+    """
+    Renews a lease every interval seconds until cancelled or the lease is lost.
+    """
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            held = await loop.run_in_executor(
+                None, queue.heartbeat, worker, report_type, report_date
+            )
+        except OSError as e:
+            print(f"Could not renew the lease of {report_date:%m/%d/%Y}: {e}")
+            continue
+        if not held:
+            print(f"Lost the lease of {report_date:%m/%d/%Y}, it was reassigned")
+            return
+
+
+async def run_worker(queue, page, pageurl, source_file, worker, timings, wait=False):
+    """
+    Leases and processes jobs until the queue is finished.
+
+    Parameters:
+    - queue (JobQueue or RemoteJobQueue): Queue served by the coordinator.
+    - page: Puppeteer page object configured to download into the folder of source_file.
+    - pageurl (str): Base URL for the licensing report page.
+    - source_file (str): Path the browser saves the CSV export to.
+    - worker (str): Id of this worker.
+    - timings (PageTimings): Learned waits and scroll positions.
+    - wait (bool): Keep polling for new jobs once the queue is finished.
+
+    Returns:
+    - int: Number of jobs this worker completed.
+
+    Notes:
+    - Queue calls block on the coordinator's HTTP API, so they run in the
+      loop's executor to keep the page and the heartbeat going meanwhile.
+    """
+    loop = asyncio.get_event_loop()
+    completed = 0
+    while True:
+        try:
+            job = await loop.run_in_executor(None, queue.lease, worker)
+            finished = job is None and not await loop.run_in_executor(
+                None, queue.unfinished
+            )
+        except OSError as e:
+            # The coordinator stops serving the queue once its run is finished
+            if not wait:
+                print(f"{worker}: queue not reachable, stopping ({e})")
+                return completed
+            await asyncio.sleep(QUEUE_POLL_INTERVAL)
+            continue
+        if job is None:
+            if not wait and finished:
+                return completed
+            await asyncio.sleep(QUEUE_POLL_INTERVAL)
+            continue
+
+        report_type, report_date, type_column = job
+        print(
+            f"{worker}: leased {report_type_name(report_type)} {report_date:%m/%d/%Y}"
+        )
+        heartbeat = asyncio.ensure_future(
+            keep_lease(queue, worker, report_type, report_date)
+        )
+        try:
+            state, result, row_count = await fetch_job_result(
+                page,
+                report_type,
+                report_date,
+                type_column,
+                pageurl,
+                source_file,
+                timings,
+            )
+        except Exception as e:
+            state, result, row_count = None, None, 0
+            print(f"{worker}: error fetching {report_date:%m/%d/%Y}: {e}")
+        finally:
+            heartbeat.cancel()
+
+        try:
+            if state is None:
+                await loop.run_in_executor(
+                    None,
+                    queue.release,
+                    worker,
+                    report_type,
+                    report_date,
+                    "fetch failed or timed out",
+                )
+            elif await loop.run_in_executor(
+                None,
+                queue.complete,
+                worker,
+                report_type,
+                report_date,
+                result,
+                row_count,
+            ):
+                completed += 1
+                print(f"{worker}: uploaded {row_count} rows of {report_date:%m/%d/%Y}")
+        except OSError as e:
+            # The lease expires and the job goes to another worker
+            print(f"{worker}: could not report {report_date:%m/%d/%Y}: {e}")
+
+
+def start_worker(queue, pageurl, browser_endpoint=None, timings_file=None, wait=False):
+    """
+    Starts a browser, or connects to a shared one, and runs a worker until the
+    queue is finished.
+    """
+    worker = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    loop = asyncio.new_event_loop()
+    if browser_endpoint:
+        browser = pyppeteerBrowserConnect(loop, browser_endpoint)
+    else:
+        browser = pyppeteerBrowserInit(loop, HEADLESS, BROWSER_WIDTH, BROWSER_HEIGHT)
+    if browser is None:
+        print("Worker not started: the browser could not be started.")
+        return 0
+    context = (
+        loop.run_until_complete(open_browser_context(browser, browser_endpoint))
+        if browser_endpoint
+        else browser
+    )
+
+    # Every worker downloads into its own folder
+    download_path = tempfile.mkdtemp(prefix="abc-worker-")
+    source_file = os.path.join(download_path, "CA-ABC-LicenseReport.csv")
+    timings = PageTimings(timings_file)
+
+    async def new_page():
+        page = await context.newPage()
+        await prepare_download_page(page, download_path, BROWSER_WIDTH, BROWSER_HEIGHT)
+        return page
+
+    try:
+        page = loop.run_until_complete(new_page())
+        completed = loop.run_until_complete(
+            run_worker(queue, page, pageurl, source_file, worker, timings, wait)
+        )
+        print(f"{worker}: finished, {completed} jobs completed")
+        return completed
+    finally:
+        timings.save()
+        if browser_endpoint:
+            loop.run_until_complete(close_browser_context(context, browser_endpoint))
+            loop.run_until_complete(browser.disconnect())
+        else:
+            loop.run_until_complete(browser.close())
+        loop.close()
+
+
+def main():
+    """
+    Runs the coordinator or a worker of a distributed backfill.
+    """
+    parser = argparse.ArgumentParser(
+        description="Distributed ABC licensing report backfill"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    coordinator = commands.add_parser(
+        "coordinator", help="Queue a date range, serve it and merge the results"
+    )
+    coordinator.add_argument(
+        "--queue",
+        required=True,
+        help="Queue folder, on a local disk of the coordinator",
+    )
+    coordinator.add_argument(
+        "--host",
+        default=QUEUE_HOST,
+        help="Interface to serve the queue on (0.0.0.0 for workers on other machines)",
+    )
+    coordinator.add_argument(
+        "--port", type=int, default=QUEUE_PORT, help="Port to serve the queue on"
+    )
+    coordinator.add_argument("--start", required=True, help="First date, YYYY-MM-DD")
+    coordinator.add_argument("--end", required=True, help="Last date, YYYY-MM-DD")
+    coordinator.add_argument(
+        "--output", default=os.getcwd(), help="Folder of the merged report"
+    )
+    coordinator.add_argument(
+        "--name", default="ABCLicensingReport", help="Report file name"
+    )
+    coordinator.add_argument(
+        "--report-types",
+        default=",".join(str(report_type) for report_type in REPORT_TYPES),
+        help="Comma separated RPTTYPE values",
+    )
+    coordinator.add_argument(
+        "--per-type", action="store_true", help="One report per report type"
+    )
+    coordinator.add_argument(
+        "--layout",
+        choices=(SINGLE_FILE_LAYOUT, MONTH_PARTITIONS, DAY_PARTITIONS),
+        default=SINGLE_FILE_LAYOUT,
+        help="Single file, or month / day partitions",
+    )
+    coordinator.add_argument(
+        "--compression",
+        choices=(GZIP_COMPRESSION, ZSTD_COMPRESSION),
+        default=None,
+        help="Compression of partition files",
+    )
+
+    worker = commands.add_parser("worker", help="Fetch queued jobs")
+    worker.add_argument(
+        "--coordinator",
+        default=f"http://127.0.0.1:{QUEUE_PORT}",
+        help="Address of the coordinator, e.g. http://192.168.1.10:8790",
+    )
+    worker.add_argument(
+        "--page-url", default=PAGE_URL, help="Licensing report page URL"
+    )
+    worker.add_argument(
+        "--browser-endpoint",
+        default=None,
+        help="Shared browser ('ws://' DevTools URL or 'http://' broker address)",
+    )
+    worker.add_argument(
+        "--timings", default=None, help="Page timings file of this worker"
+    )
+    worker.add_argument(
+        "--wait",
+        action="store_true",
+        help="Keep waiting for jobs once the queue is finished",
+    )
+    args = parser.parse_args()
+
+    if args.command == "coordinator":
+        outputs = run_coordinator(
+            JobQueue(args.queue),
+            datetime.strptime(args.start, "%Y-%m-%d"),
+            datetime.strptime(args.end, "%Y-%m-%d"),
+            args.output,
+            args.name,
+            [int(report_type) for report_type in args.report_types.split(",")],
+            not args.per_type,
+            args.layout,
+            args.compression,
+            host=args.host,
+            port=args.port,
+        )
+        for output in outputs:
+            print(f"Report written to {output}")
+        if not outputs:
+            print("No report rows were found in the date range")
+    else:
+        start_worker(
+            RemoteJobQueue(args.coordinator),
+            args.page_url,
+            args.browser_endpoint,
+            args.timings,
+            args.wait,
+        )
+
+
+if __name__ == "__main__":
+    main()